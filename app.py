@@ -1,32 +1,88 @@
 import cv2
 import os
+import sys
 import pickle
 import numpy as np
-import face_recognition
 from datetime import datetime
 import json
+import re
+import struct
+import hashlib
 import tkinter as tk
-from tkinter import messagebox, font as tkfont, scrolledtext
-from functools import partial
+from tkinter import messagebox, ttk
+from functools import partial, cache
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import calendar
+import bisect
+from operator import itemgetter
+import threading
+from collections import deque
+import atexit
 from time import strftime
 
+try:
+    import orjson # Optional: much faster JSON parsing/serialization
+except ImportError:
+    orjson = None
+
 # ===============================
 # CONFIGURATION & CONSTANTS
 # ===============================
 KNOWN_FACES_DIR = "known_faces"
-ENCODINGS_FILE = "encodings.pkl"
+ENCODINGS_FILE = "encodings.pkl" # Legacy pickle format, only read as a fallback
+FACE_GALLERY_FILE = "face_gallery.bin" # Stores face encodings and their names in one memory-mapped file
 PATIENT_DATA_FILE = "patient_data.json" # Stores permanent patient records
 APPOINTMENTS_FILE = "appointments.json" # Stores current appointments
 DOCTOR_DATA_FILE = "doctor_data.json" # Stores doctor records
 TOLERANCE = 0.6
-FRAME_RESIZE_SCALE = 0.25  # 1/4 size for faster processing
-MODEL = "hog"
+CAPTURE_WIDTH = 640 # Resolution requested from the webcam; frames are displayed at this size
+CAPTURE_HEIGHT = 480
+FRAME_RESIZE_SCALE = 0.5  # 1/2 size for faster processing (320x240 at the capture resolution)
+USE_OPENCL_RESIZE = False # Downscale frames on the GPU via OpenCL; the transfers usually cost more than a CPU resize
+DETECT_UPSAMPLE = 0 # Detector upsampling passes; scaling the frame less is cheaper than upsampling it
+FRAME_SKIP = 2 # Detect and encode faces on every Nth live frame; the frames in between reuse the results
+MODEL = "hog" # Switched to "dnn" or "cnn" on first use when available (see select_detection_model)
+DNN_PROTOTXT_FILE = "deploy.prototxt" # Optional OpenCV DNN face detector (SSD ResNet-10)
+DNN_MODEL_FILE = "res10_300x300_ssd_iter_140000.caffemodel"
+DNN_CONFIDENCE = 0.5 # Minimum DNN detection confidence
+DETECT_BATCH = 32 # Max frames per batched CNN detection call
+ENCODING_DIM = 128 # Length of a face_recognition face encoding
+ENCODING_STORE_DTYPE = np.float16 # On-disk precision of encodings (half the size of float32)
+# Face gallery layout: header | encodings[N, dim] | name_offsets uint32[N + 1] | UTF-8 name bytes
+GALLERY_MAGIC = b"ITSG"
+GALLERY_HEADER = struct.Struct("<4sIIII12x") # magic, N, dim, encoding itemsize, name byte count (32 bytes)
 FONT = cv2.FONT_HERSHEY_DUPLEX
 NUM_REGISTRATION_IMAGES = 5 # Images to capture for new user
+REGISTRATION_MAX_CAPTURES = 15 # Give up on retaking unusable images after this many captures
 INFO_PANEL_WIDTH = 400 # Width of the new data panel in the CV2 window
 # NEW: Define a standardized size for Tkinter windows (e.g., 600x800)
 TK_WINDOW_GEOMETRY = "600x800" 
+TABLE_PAGE_SIZE = 200 # Rows added to a table (appointments, doctors) per scroll page
+APPOINTMENT_SAVE_DELAY = 1.0 # Seconds to coalesce appointment changes before writing to disk
+FORM_DEBOUNCE_MS = 40 # Quiet period before a form reacts to a burst of field changes
+
+# Tkinter styling shared by every window. Fonts are plain (family, size, weight)
+# descriptors: Tk resolves them through its own font cache, and unlike font.Font
+# objects they are not bound to a single Tk interpreter.
+BG_COLOR = "#0D1117"
+FG_COLOR = "#00FFCC"
+ACTIVE_COLOR = "#00B38F"
+FIELD_BG_COLOR = "#21262D"
+ACCENT_COLOR = "#FF00CC"
+UI_FONT = ("Consolas", 10)
+TITLE_FONT = ("Consolas", 14, "bold")
+MENU_FONT = ("Consolas", 12, "bold")
+# Table columns as (key, heading, width in px), shared by every place that builds or updates the tables
+APPOINTMENT_COLUMNS = (("id", "ID", 40), ("name", "PATIENT ID", 120), ("date", "DATE", 90),
+                       ("time", "TIME", 60), ("doctor", "DOCTOR", 100), ("reason", "REASON", 150))
+DOCTOR_COLUMNS = (("name", "DOCTOR NAME", 110), ("specialization", "SPECIALIZATION", 110), ("hours", "HOURS", 90),
+                  ("days", "AVAILABLE DAYS", 130), ("contact", "CONTACT", 120))
+MONTH_NAMES = list(calendar.month_abbr)[1:] # Jan, Feb, Mar...
+MONTH_ABBR_TO_NUM = {abbr: i for i, abbr in enumerate(MONTH_NAMES, 1)} # "Jan" -> 1, ...
+DAYS_PER_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31) # Non-leap year
+# 24h "H:M" / "HH:MM" times, accepting exactly what strptime(..., "%H:%M") accepts
+TIME_HHMM_RE = re.compile(r"([01]?\d|2[0-3]):[0-5]?\d")
 
 # Color codes for terminal logging (ANSI)
 CYAN = '\033[96m'
@@ -39,60 +95,101 @@ END = '\033[0m'
 # Global variables for real-time data sharing
 PATIENT_RECORDS = {} 
 APPOINTMENTS = []
+APPOINTMENTS_BY_ID = {} # Stable appointment id -> the same dict held in APPOINTMENTS
+APPOINTMENTS_BY_NAME = {} # Lowercased patient name -> that patient's appointments, in APPOINTMENTS order
+_NEXT_APPOINTMENT_ID = 1 # Id given to the next booked appointment
 DOCTOR_RECORDS = {} # Global variable for doctor records
+_DOCTOR_SORT_CACHE = None # Sorted tuple of doctor names, rebuilt only after DOCTOR_RECORDS changes
 KNOWN_ENCODINGS = []
 KNOWN_NAMES = []
+KNOWN_RECORDS = [] # Patient record for each row of KNOWN_ENCODINGS (None if missing)
+KNOWN_LABELS = [] # Upper-cased name for each row of KNOWN_ENCODINGS, as drawn on face boxes
+KNOWN_NORMS = np.empty(0, dtype=np.float32) # L2 norm of each row of KNOWN_ENCODINGS
+KNOWN_SQNORMS = np.empty(0, dtype=np.float32) # Squared L2 norm of each row of KNOWN_ENCODINGS
+_TK_ROOT = None # The single, hidden Tk root every window is opened on (created on first use)
+_IN_DETECT_WORKER = False # True in detection pool workers, which take MODEL from the parent process
+
+# Appointments are kept ordered by this key (a C-level callable, cheaper than a lambda)
+APPOINTMENT_SORT_KEY = itemgetter('date', 'time')
+
+# Digest of the last bytes written to each data file, used to skip no-op saves
+_LAST_WRITE_DIGESTS = {}
+
+# Deferred appointment saving state
+_APPTS_DIRTY = False
+_APPTS_SAVE_TIMER = None
+_APPTS_LOCK = threading.RLock()
 
 # ===============================
 # 1. STYLIZED LOGGING FUNCTION
 # ===============================
 
+# Color and tag are joined once here rather than on every log call
+LOG_LEVEL_PREFIXES = {
+    "INFO": f"{CYAN}[{BOLD}SYS-LOG{END}]",
+    "WARNING": f"{YELLOW}[{BOLD}WARNING{END}]",
+    "CRITICAL": f"{CRITICAL_RED}[{BOLD}ALERT-TRIAGE{END}]",
+    "SUCCESS": f"{NEON_GREEN}[{BOLD}STATUS-OK{END}]",
+}
+DEFAULT_LOG_PREFIX = "[LOG]"
+
 def cyber_log(message, level="INFO"):
     """Prints a stylized message to the console."""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    
-    if level == "INFO":
-        color = CYAN
-        prefix = f"[{BOLD}SYS-LOG{END}]"
-    elif level == "WARNING":
-        color = YELLOW
-        prefix = f"[{BOLD}WARNING{END}]"
-    elif level == "CRITICAL":
-        color = CRITICAL_RED
-        prefix = f"[{BOLD}ALERT-TRIAGE{END}]"
-    elif level == "SUCCESS":
-        color = NEON_GREEN
-        prefix = f"[{BOLD}STATUS-OK{END}]"
-    else:
-        color = ""
-        prefix = "[LOG]"
-
-    print(f"{color}{prefix} <{timestamp}> {message}{END}")
+    prefix = LOG_LEVEL_PREFIXES.get(level, DEFAULT_LOG_PREFIX)
+    # time.strftime formats the struct_time directly, no datetime object needed
+    sys.stdout.write(f"{prefix} <{strftime('%H:%M:%S')}> {message}{END}\n")
 
 # ===============================
 # 2. JSON & ENCODING HANDLERS (Patient Data)
 # ===============================
 
+def read_json(path):
+    """Parses a JSON file, using orjson when it is installed."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def atomic_write_bytes(path, data):
+    """Writes data in one call to a temp file, then swaps it into place so a crash never leaves a half-written file."""
+    # Skip the write (and its fsync) when the content is identical to what we last wrote
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+    if _LAST_WRITE_DIGESTS.get(path) == digest:
+        return
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _LAST_WRITE_DIGESTS[path] = digest
+
+def write_json(path, obj):
+    """Writes obj to a JSON file in indented form, using orjson when it is installed."""
+    if orjson is not None:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(obj, indent=4).encode('utf-8')
+    atomic_write_bytes(path, data)
+
 def load_patient_records():
     """Loads patient records from the JSON file into the global dictionary."""
     global PATIENT_RECORDS
-    if os.path.exists(PATIENT_DATA_FILE):
-        try:
-            with open(PATIENT_DATA_FILE, 'r') as f:
-                PATIENT_RECORDS = json.load(f)
-            cyber_log(f"Loaded {len(PATIENT_RECORDS)} patient records from {PATIENT_DATA_FILE}", "INFO")
-        except json.JSONDecodeError:
-            cyber_log("ERROR: Could not decode JSON data. Starting with empty records.", "CRITICAL")
-            PATIENT_RECORDS = {}
-    else:
+    try:
+        PATIENT_RECORDS = read_json(PATIENT_DATA_FILE)
+        cyber_log(f"Loaded {len(PATIENT_RECORDS)} patient records from {PATIENT_DATA_FILE}", "INFO")
+    except FileNotFoundError:
         cyber_log(f"{PATIENT_DATA_FILE} not found. Creating empty file.", "WARNING")
         PATIENT_RECORDS = {}
         save_patient_records_to_file()
+    except json.JSONDecodeError:
+        cyber_log("ERROR: Could not decode JSON data. Starting with empty records.", "CRITICAL")
+        PATIENT_RECORDS = {}
 
 def save_patient_records_to_file():
     """Saves the current global patient records to the JSON file."""
-    with open(PATIENT_DATA_FILE, 'w') as f:
-        json.dump(PATIENT_RECORDS, f, indent=4)
+    write_json(PATIENT_DATA_FILE, PATIENT_RECORDS)
 
 def save_patient_record(name, data):
     """Saves a single patient record to the global dictionary and JSON file."""
@@ -108,61 +205,267 @@ def save_patient_record(name, data):
 def load_appointments():
     """Loads appointments from the JSON file into the global list."""
     global APPOINTMENTS
-    if os.path.exists(APPOINTMENTS_FILE):
-        try:
-            with open(APPOINTMENTS_FILE, 'r') as f:
-                APPOINTMENTS = json.load(f)
-            # Sort appointments by date and time for better viewing
-            APPOINTMENTS.sort(key=lambda x: (x['date'], x['time']))
-            cyber_log(f"Loaded {len(APPOINTMENTS)} pending appointments from {APPOINTMENTS_FILE}", "INFO")
-        except json.JSONDecodeError:
-            cyber_log("ERROR: Could not decode appointments JSON data. Starting with empty list.", "CRITICAL")
-            APPOINTMENTS = []
-    else:
+    try:
+        APPOINTMENTS = read_json(APPOINTMENTS_FILE)
+        # Sort appointments by date and time for better viewing
+        APPOINTMENTS.sort(key=APPOINTMENT_SORT_KEY)
+        cyber_log(f"Loaded {len(APPOINTMENTS)} pending appointments from {APPOINTMENTS_FILE}", "INFO")
+    except FileNotFoundError:
         cyber_log(f"{APPOINTMENTS_FILE} not found. Creating empty file.", "WARNING")
         APPOINTMENTS = []
         save_appointments()
+    except json.JSONDecodeError:
+        cyber_log("ERROR: Could not decode appointments JSON data. Starting with empty list.", "CRITICAL")
+        APPOINTMENTS = []
+    if index_appointments():
+        save_appointments() # Persist ids given to appointments saved before ids existed
+
+def index_appointments():
+    """
+    Builds APPOINTMENTS_BY_ID and APPOINTMENTS_BY_NAME, giving any appointment without
+    an id the next free one. Returns True if any ids were assigned.
+    """
+    global APPOINTMENTS_BY_ID, APPOINTMENTS_BY_NAME, _NEXT_APPOINTMENT_ID
+    _NEXT_APPOINTMENT_ID = max((appt['id'] for appt in APPOINTMENTS if 'id' in appt), default=0) + 1
+    assigned = False
+    for appt in APPOINTMENTS:
+        if 'id' not in appt:
+            appt['id'] = _NEXT_APPOINTMENT_ID
+            _NEXT_APPOINTMENT_ID += 1
+            assigned = True
+    APPOINTMENTS_BY_ID = {appt['id']: appt for appt in APPOINTMENTS}
+    APPOINTMENTS_BY_NAME = {}
+    for appt in APPOINTMENTS:
+        APPOINTMENTS_BY_NAME.setdefault(appt['name'].lower(), []).append(appt)
+    return assigned
 
 def save_appointments():
     """Saves the current global appointments list to the JSON file."""
-    with open(APPOINTMENTS_FILE, 'w') as f:
-        json.dump(APPOINTMENTS, f, indent=4)
+    global _APPTS_DIRTY
+    with _APPTS_LOCK:
+        write_json(APPOINTMENTS_FILE, APPOINTMENTS)
+        _APPTS_DIRTY = False
+
+def flush_appointments():
+    """Writes appointments to disk now if there are unsaved changes."""
+    global _APPTS_SAVE_TIMER
+    with _APPTS_LOCK:
+        if _APPTS_SAVE_TIMER is not None:
+            _APPTS_SAVE_TIMER.cancel()
+            _APPTS_SAVE_TIMER = None
+        if _APPTS_DIRTY:
+            save_appointments()
+
+def schedule_appointments_save():
+    """Marks appointments as changed and saves them after APPOINTMENT_SAVE_DELAY, coalescing bursts of changes."""
+    global _APPTS_DIRTY, _APPTS_SAVE_TIMER
+    with _APPTS_LOCK:
+        _APPTS_DIRTY = True
+        if _APPTS_SAVE_TIMER is None:
+            _APPTS_SAVE_TIMER = threading.Timer(APPOINTMENT_SAVE_DELAY, flush_appointments)
+            _APPTS_SAVE_TIMER.daemon = True
+            _APPTS_SAVE_TIMER.start()
+
+# Make sure a pending deferred save is never lost on exit
+atexit.register(flush_appointments)
         
 def add_appointment(data):
-    """Adds a new appointment to the global list and saves."""
-    global APPOINTMENTS
-    APPOINTMENTS.append(data)
-    # Re-sort list after adding new appointment
-    APPOINTMENTS.sort(key=lambda x: (x['date'], x['time'])) 
-    save_appointments()
+    """Adds a new appointment (giving it a stable id) to the global list and schedules a save."""
+    global APPOINTMENTS, _NEXT_APPOINTMENT_ID
+    with _APPTS_LOCK:
+        data['id'] = _NEXT_APPOINTMENT_ID
+        _NEXT_APPOINTMENT_ID += 1
+        APPOINTMENTS_BY_ID[data['id']] = data
+        # Lists are kept sorted, so insert in place instead of re-sorting everything
+        bisect.insort(APPOINTMENTS, data, key=APPOINTMENT_SORT_KEY)
+        bisect.insort(APPOINTMENTS_BY_NAME.setdefault(data['name'].lower(), []), data, key=APPOINTMENT_SORT_KEY)
+    schedule_appointments_save()
     cyber_log(f"New appointment booked for {data['name']} on {data['date']} at {data['time']} with Dr. {data['doctor']}.", "SUCCESS")
 
+@cache
+def parse_appointment_date(date_text):
+    """Parses a "YYYY-MM-DD" appointment date once per distinct string; None if it is malformed."""
+    try:
+        return datetime.strptime(date_text, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+def remove_appointment(appt):
+    """Removes an appointment from the global list and id index and schedules a save."""
+    with _APPTS_LOCK:
+        del APPOINTMENTS_BY_ID[appt['id']]
+        patient_appts = APPOINTMENTS_BY_NAME[appt['name'].lower()]
+        patient_appts.remove(appt)
+        if not patient_appts:
+            del APPOINTMENTS_BY_NAME[appt['name'].lower()]
+        # The list is sorted, so bisect to the appointment's (date, time) slot instead of scanning
+        i = bisect.bisect_left(APPOINTMENTS, APPOINTMENT_SORT_KEY(appt), key=APPOINTMENT_SORT_KEY)
+        while APPOINTMENTS[i] is not appt:
+            i += 1
+        del APPOINTMENTS[i]
+    schedule_appointments_save()
+
 
 # ===============================
 # 2c. ENCODING HANDLERS
 # ===============================
 
+def empty_known_faces():
+    """Returns an empty (encodings matrix, names array) pair."""
+    return np.empty((0, ENCODING_DIM), dtype=np.float32), np.array([], dtype=object)
+
+def read_face_gallery(path):
+    """
+    Reads a face gallery file through one memory map and slices out its three arrays.
+    No parsing step: encodings, name offsets and name bytes are laid out back to back.
+    """
+    raw = np.memmap(path, dtype=np.uint8, mode='r')
+    magic, count, dim, itemsize, names_size = GALLERY_HEADER.unpack(raw[:GALLERY_HEADER.size].tobytes())
+    if magic != GALLERY_MAGIC:
+        raise ValueError(f"{path} is not a face gallery file")
+    if dim != ENCODING_DIM or itemsize not in (2, 4, 8):
+        raise ValueError(f"{path} has unsupported encodings ({dim} values of {itemsize} bytes)")
+
+    start = GALLERY_HEADER.size
+    end = start + count * dim * itemsize
+    expected_size = end + (count + 1) * 4 + names_size
+    if raw.size != expected_size:
+        raise ValueError(f"{path} is {raw.size} bytes, expected {expected_size} (truncated or corrupt)")
+    stored = raw[start:end].view(f"<f{itemsize}").reshape(count, dim)
+    offsets = raw[end:end + (count + 1) * 4].view("<u4")
+    name_bytes = raw[end + (count + 1) * 4:]
+    if offsets[0] != 0 or offsets[-1] != names_size or np.any(np.diff(offsets.astype(np.int64)) < 0):
+        raise ValueError(f"{path} has corrupt name offsets")
+
+    # Stored at reduced precision, so upcast (and copy out of the map) once here;
+    # matching always runs in float32.
+    encodings = np.array(stored, dtype=np.float32)
+    names = np.array([name_bytes[offsets[i]:offsets[i + 1]].tobytes().decode("utf-8") for i in range(count)], dtype=object)
+    return encodings, names
+
 def load_known_faces():
-    """Load known faces from saved pickle file or rebuild from images."""
-    if os.path.exists(ENCODINGS_FILE):
-        cyber_log("Loading known face encodings from file...", "INFO")
+    """
+    Load known faces from the saved face gallery (or legacy pickle file), or rebuild from images.
+    Encodings are returned as one contiguous (N, 128) float32 matrix so matching
+    is a single vectorized distance computation instead of a per-face Python loop.
+    """
+    try:
+        encodings, names = read_face_gallery(FACE_GALLERY_FILE)
+        cyber_log(f"Loaded {len(names)} known face encodings from {FACE_GALLERY_FILE}", "INFO")
+        return encodings, names
+    except FileNotFoundError:
+        pass # Fall back to the legacy pickle file
+    except (OSError, ValueError, struct.error) as e:
+        cyber_log(f"ERROR: Could not load encodings file: {e}. Starting fresh.", "CRITICAL")
+        return empty_known_faces()
+
+    try:
+        with open(ENCODINGS_FILE, "rb") as f:
+            data = pickle.load(f)
+        cyber_log(f"Loaded {len(data['names'])} known face encodings from legacy {ENCODINGS_FILE}", "INFO")
+        if not len(data["encodings"]):
+            return empty_known_faces()
+        encodings = np.ascontiguousarray(np.asarray(data["encodings"], dtype=np.float32))
+        names = np.array(data["names"], dtype=object)
+    except FileNotFoundError:
+        pass # Nothing saved yet
+    except Exception as e:
+        cyber_log(f"ERROR: Could not load encodings file: {e}. Starting fresh.", "CRITICAL")
+        return empty_known_faces()
+    else:
+        # Convert once, so later starts map the gallery file instead of unpickling
         try:
-            with open(ENCODINGS_FILE, "rb") as f:
-                data = pickle.load(f)
-            return data["encodings"], data["names"]
-        except Exception as e:
-            cyber_log(f"ERROR: Could not load encodings file: {e}. Starting fresh.", "CRITICAL")
-            return [], []
-
-    cyber_log("Encodings file not found. Starting with empty encodings.", "WARNING")
-    return [], []
+            save_encodings(encodings, names)
+        except OSError as e:
+            cyber_log(f"Could not convert {ENCODINGS_FILE} to {FACE_GALLERY_FILE}: {e}", "WARNING")
+        return encodings, names
+
+    cyber_log("Encodings file not found. Rebuilding from saved face images...", "WARNING")
+    encodings, names = rebuild_known_faces()
+    if len(names):
+        save_encodings(encodings, names)
+    return encodings, names
+
+def index_known_faces():
+    """
+    Builds per-row lookup data for the encodings matrix: the patient record and box label
+    for each row (so a match index maps straight to them) and each row's (squared) norm
+    for pruning and distance computation.
+    """
+    global KNOWN_RECORDS, KNOWN_LABELS, KNOWN_NORMS, KNOWN_SQNORMS
+    KNOWN_RECORDS = [PATIENT_RECORDS.get(name) for name in KNOWN_NAMES]
+    KNOWN_LABELS = [name.upper() for name in KNOWN_NAMES]
+    KNOWN_SQNORMS = np.einsum('ij,ij->i', KNOWN_ENCODINGS, KNOWN_ENCODINGS)
+    KNOWN_NORMS = np.sqrt(KNOWN_SQNORMS)
 
 def save_encodings(encodings, names):
-    """Saves the current list of encodings and names to a pickle file."""
-    data = {"encodings": encodings, "names": names}
-    with open(ENCODINGS_FILE, "wb") as f:
-        pickle.dump(data, f)
-    cyber_log(f"Saved {len(names)} face encodings to {ENCODINGS_FILE}.", "SUCCESS")
+    """Saves the encodings matrix and names together as one face gallery file."""
+    matrix = np.ascontiguousarray(encodings, dtype=np.dtype(ENCODING_STORE_DTYPE).newbyteorder("<"))
+    encoded_names = [name.encode("utf-8") for name in names]
+    offsets = np.zeros(len(encoded_names) + 1, dtype="<u4")
+    offsets[1:] = np.cumsum([len(b) for b in encoded_names], dtype=np.int64)
+
+    header = GALLERY_HEADER.pack(GALLERY_MAGIC, len(encoded_names), ENCODING_DIM, matrix.itemsize, int(offsets[-1]))
+    atomic_write_bytes(FACE_GALLERY_FILE, b"".join([header, matrix.tobytes(), offsets.tobytes(), *encoded_names]))
+    cyber_log(f"Saved {len(names)} face encodings to {FACE_GALLERY_FILE}.", "SUCCESS")
+
+def _batch_sqdist(known, known_sqnorms, probe):
+    """
+    Returns the squared Euclidean distance from the probe encoding to every row of known,
+    expanded as |k|^2 - 2 k.p + |p|^2. The k.p term is one BLAS matrix-vector product,
+    so no (N, 128) difference matrix is built; |k|^2 is precomputed per row.
+    """
+    sq_distances = known @ probe
+    sq_distances *= -2
+    sq_distances += known_sqnorms
+    sq_distances += probe @ probe
+    return sq_distances
+
+def _nearest_known(known, known_norms, probe, probe_norm, tolerance):
+    """Returns the index of the closest known encoding within tolerance of probe, or -1."""
+    best_index = -1
+    best_sq = tolerance * tolerance
+    for i in range(known.shape[0]):
+        if abs(known_norms[i] - probe_norm) > tolerance:
+            continue
+        sq = 0.0
+        for j in range(known.shape[1]):
+            d = known[i, j] - probe[j]
+            sq += d * d
+        # A distance exactly at the threshold still matches; ties otherwise keep the first row
+        if sq < best_sq or (best_index < 0 and sq == best_sq):
+            best_index = i
+            best_sq = sq
+    return best_index
+
+def match_face(face_encoding):
+    """
+    Returns the KNOWN_ENCODINGS row index matching face_encoding, or None.
+    By the triangle inequality, | |k| - |p| | <= |k - p|, so rows whose norm differs from
+    the probe's by more than TOLERANCE cannot match and are skipped before the
+    full 128-d distance is computed.
+    """
+    if not len(KNOWN_ENCODINGS):
+        return None
+    probe = face_encoding.astype(np.float32)
+    match_kernel = load_match_kernel()
+    if match_kernel is not None:
+        best = match_kernel(KNOWN_ENCODINGS, KNOWN_NORMS, probe, np.linalg.norm(probe), TOLERANCE)
+        return best if best >= 0 else None
+
+    candidates = np.flatnonzero(np.abs(KNOWN_NORMS - np.linalg.norm(probe)) <= TOLERANCE)
+    if not len(candidates):
+        return None
+
+    # Only gather rows when the filter actually removed some
+    if len(candidates) == len(KNOWN_ENCODINGS):
+        sq_distances = _batch_sqdist(KNOWN_ENCODINGS, KNOWN_SQNORMS, probe)
+    else:
+        sq_distances = _batch_sqdist(KNOWN_ENCODINGS[candidates], KNOWN_SQNORMS[candidates], probe)
+    best = int(np.argmin(sq_distances))
+    if sq_distances[best] <= TOLERANCE ** 2:
+        return int(candidates[best])
+    return None
 
 # ===============================
 # 2d. DOCTOR HANDLERS
@@ -170,46 +473,390 @@ def save_encodings(encodings, names):
 
 def load_doctor_records():
     """Loads doctor records from the JSON file into the global dictionary."""
-    global DOCTOR_RECORDS
-    if os.path.exists(DOCTOR_DATA_FILE):
-        try:
-            with open(DOCTOR_DATA_FILE, 'r') as f:
-                DOCTOR_RECORDS = json.load(f)
-            cyber_log(f"Loaded {len(DOCTOR_RECORDS)} doctor records from {DOCTOR_DATA_FILE}", "INFO")
-        except json.JSONDecodeError:
-            cyber_log("ERROR: Could not decode Doctor JSON data. Starting with empty records.", "CRITICAL")
-            DOCTOR_RECORDS = {}
-    else:
+    global DOCTOR_RECORDS, _DOCTOR_SORT_CACHE
+    _DOCTOR_SORT_CACHE = None
+    try:
+        DOCTOR_RECORDS = read_json(DOCTOR_DATA_FILE)
+        cyber_log(f"Loaded {len(DOCTOR_RECORDS)} doctor records from {DOCTOR_DATA_FILE}", "INFO")
+    except FileNotFoundError:
         cyber_log(f"{DOCTOR_DATA_FILE} not found. Creating empty file.", "WARNING")
         DOCTOR_RECORDS = {}
         save_doctor_records()
+    except json.JSONDecodeError:
+        cyber_log("ERROR: Could not decode Doctor JSON data. Starting with empty records.", "CRITICAL")
+        DOCTOR_RECORDS = {}
 
 def save_doctor_records():
     """Saves the current global doctor records to the JSON file."""
-    with open(DOCTOR_DATA_FILE, 'w') as f:
-        json.dump(DOCTOR_RECORDS, f, indent=4)
+    write_json(DOCTOR_DATA_FILE, DOCTOR_RECORDS)
 
 def save_doctor_record(name, data):
     """Saves a single doctor record to the global dictionary and JSON file."""
-    global DOCTOR_RECORDS
+    global DOCTOR_RECORDS, _DOCTOR_SORT_CACHE
     DOCTOR_RECORDS[name] = data
+    _DOCTOR_SORT_CACHE = None
     save_doctor_records()
     cyber_log(f"Doctor {name} data saved to JSON.", "SUCCESS")
 
+def sorted_doctor_names():
+    """
+    Returns doctor names as a sorted tuple, sorting only after the records have changed.
+    The same tuple is shared by the roster view and the booking form's doctor menu.
+    """
+    global _DOCTOR_SORT_CACHE
+    if _DOCTOR_SORT_CACHE is None:
+        _DOCTOR_SORT_CACHE = tuple(sorted(DOCTOR_RECORDS))
+    return _DOCTOR_SORT_CACHE
+
+# ===============================
+# 2e. FRAME PROCESSING HELPERS
+# ===============================
+
+@cache
+def load_face_recognition():
+    """
+    Imports face_recognition on first use. The import loads dlib and deserializes its
+    models, which menu-only sessions never need. Also picks the detection model.
+    """
+    import face_recognition
+    select_detection_model()
+    return face_recognition
+
+@cache
+def load_match_kernel():
+    """Returns _nearest_known compiled by Numba, or None if numba is not installed."""
+    try:
+        from numba import njit # Optional: compiles the face matching loop to machine code
+    except ImportError:
+        return None
+    return njit(cache=True, fastmath=True)(_nearest_known)
+
+def downscale_frame(frame, out=None):
+    """
+    Shrinks a captured BGR frame by FRAME_RESIZE_SCALE for faster processing.
+    If out (a buffer from an earlier call) is given, the result is written into it.
+    With USE_OPENCL_RESIZE (and OpenCL available) the resize runs on the GPU through
+    a UMat and only the small result is copied back.
+    """
+    if USE_OPENCL_RESIZE and cv2.ocl.useOpenCL():
+        small = cv2.resize(cv2.UMat(frame), (0, 0), fx=FRAME_RESIZE_SCALE, fy=FRAME_RESIZE_SCALE, interpolation=cv2.INTER_AREA).get()
+        if out is None:
+            return small
+        np.copyto(out, small)
+        return out
+    if out is None:
+        return cv2.resize(frame, (0, 0), fx=FRAME_RESIZE_SCALE, fy=FRAME_RESIZE_SCALE, interpolation=cv2.INTER_AREA)
+    return cv2.resize(frame, (out.shape[1], out.shape[0]), dst=out, interpolation=cv2.INTER_AREA)
+
+def bgr_to_rgb(frame, out=None):
+    """
+    Returns an RGB copy of a BGR frame, written into out if it is given.
+    Reversing the channel axis is a free view; dlib needs contiguous memory,
+    so it is materialized with one straight copy.
+    """
+    if out is None:
+        return np.ascontiguousarray(frame[:, :, ::-1])
+    np.copyto(out, frame[:, :, ::-1])
+    return out
+
+def detect_faces(small_frame):
+    """
+    Returns face locations (top, right, bottom, left) found in a downscaled BGR frame.
+    HOG works on intensity gradients only, so it is fed a single-channel image.
+    """
+    face_recognition = load_face_recognition()
+    if MODEL == "dnn":
+        return detect_faces_dnn(small_frame)
+    if MODEL == "hog":
+        detect_image = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
+    else:
+        detect_image = bgr_to_rgb(small_frame)
+    return face_recognition.face_locations(detect_image, number_of_times_to_upsample=DETECT_UPSAMPLE, model=MODEL)
+
+def detect_faces_batch(small_frames, parallel=False):
+    """
+    Returns one list of face locations per downscaled BGR frame.
+    With the CNN model all frames go to the GPU in batches of DETECT_BATCH.
+    HOG has no batched path; with parallel=True (offline rebuilds of many images)
+    frames are spread over worker processes instead, otherwise they run in turn.
+    """
+    if not small_frames:
+        return []
+    face_recognition = load_face_recognition()
+    if MODEL == "cnn":
+        rgb_frames = [bgr_to_rgb(f) for f in small_frames]
+        return face_recognition.batch_face_locations(rgb_frames, number_of_times_to_upsample=DETECT_UPSAMPLE, batch_size=DETECT_BATCH)
+    if MODEL == "hog" and parallel and len(small_frames) > 1:
+        # dlib's HOG detector is single-threaded, so spread frames over the cores
+        with start_detect_pool(len(small_frames)) as pool:
+            return list(pool.map(detect_faces, small_frames))
+    return [detect_faces(f) for f in small_frames]
+
+@cache
+def load_dnn_detector():
+    """Loads the OpenCV DNN face detector, running it on CUDA when OpenCV was built with it."""
+    net = cv2.dnn.readNetFromCaffe(DNN_PROTOTXT_FILE, DNN_MODEL_FILE)
+    if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+        net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
+    return net
+
+def detect_faces_dnn(small_frame):
+    """Runs the OpenCV DNN detector and returns boxes in face_recognition's (top, right, bottom, left) order."""
+    net = load_dnn_detector()
+    H, W = small_frame.shape[:2]
+    blob = cv2.dnn.blobFromImage(cv2.resize(small_frame, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
+    net.setInput(blob)
+    # Each detection row: [image_id, label, confidence, x1, y1, x2, y2] with coordinates in 0..1
+    detections = net.forward()[0, 0]
+    boxes = detections[detections[:, 2] >= DNN_CONFIDENCE, 3:7] * np.array([W, H, W, H])
+
+    face_locations = []
+    for x1, y1, x2, y2 in boxes.astype(int).tolist():
+        left, top, right, bottom = max(x1, 0), max(y1, 0), min(x2, W), min(y2, H)
+        if right > left and bottom > top:
+            face_locations.append((top, right, bottom, left))
+    return face_locations
+
+def open_camera():
+    """Opens the default webcam at CAPTURE_WIDTH x CAPTURE_HEIGHT with a one-frame driver buffer."""
+    cap = cv2.VideoCapture(0)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAPTURE_WIDTH)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAPTURE_HEIGHT)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+def start_detect_pool(num_frames):
+    """Starts a spawned (not forked) process pool with at most one worker per frame."""
+    workers = min(os.cpu_count() or 1, num_frames)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=init_detect_worker, initargs=(MODEL,))
+
+def init_detect_worker(model):
+    """Pool initializer: adopts the parent's detector so workers do not re-select and re-log it."""
+    global MODEL, _IN_DETECT_WORKER
+    MODEL = model
+    _IN_DETECT_WORKER = True
+
+def select_detection_model():
+    """
+    Picks the face detector: the OpenCV DNN model if its files are present,
+    else dlib's CNN when dlib was compiled with CUDA, otherwise HOG.
+    """
+    global MODEL
+    if _IN_DETECT_WORKER:
+        return
+    import dlib
+    if os.path.exists(DNN_PROTOTXT_FILE) and os.path.exists(DNN_MODEL_FILE):
+        MODEL = "dnn"
+    elif dlib.DLIB_USE_CUDA:
+        MODEL = "cnn"
+    cyber_log(f"Face detector: {MODEL} (dlib CUDA support: {'yes' if dlib.DLIB_USE_CUDA else 'no'}).", "INFO")
+    cyber_log(f"OpenCL frame resizing: {'on' if USE_OPENCL_RESIZE and cv2.ocl.useOpenCL() else 'off'}.", "INFO")
+
+def rebuild_known_faces():
+    """Re-encodes every patient from the images saved in KNOWN_FACES_DIR/<name>/."""
+    if not os.path.isdir(KNOWN_FACES_DIR):
+        return empty_known_faces()
+
+    # Gather every image first so detection runs as one parallel batch
+    owners = []
+    small_frames = []
+    for name in sorted(os.listdir(KNOWN_FACES_DIR)):
+        person_dir = os.path.join(KNOWN_FACES_DIR, name)
+        if not os.path.isdir(person_dir):
+            continue
+        for file_name in sorted(os.listdir(person_dir)):
+            if not file_name.lower().endswith((".jpg", ".jpeg", ".png")):
+                continue
+            image = cv2.imread(os.path.join(person_dir, file_name))
+            if image is not None:
+                owners.append(name)
+                small_frames.append(downscale_frame(image))
+
+    if not small_frames:
+        return empty_known_faces() # Nothing to encode, so dlib need not be loaded
+    face_recognition = load_face_recognition()
+    person_encodings = {}
+    for name, small_frame, face_locations in zip(owners, small_frames, detect_faces_batch(small_frames, parallel=True)):
+        if len(face_locations) == 1:
+            rgb_small_frame = bgr_to_rgb(small_frame)
+            encoding = face_recognition.face_encodings(rgb_small_frame, face_locations)[0]
+            person_encodings.setdefault(name, []).append(encoding)
+
+    if not person_encodings:
+        return empty_known_faces()
+
+    names = list(person_encodings)
+    encodings = np.array([np.mean(person_encodings[name], axis=0) for name in names], dtype=np.float32)
+    cyber_log(f"Rebuilt encodings for {len(names)} patients from {len(small_frames)} images.", "SUCCESS")
+    return encodings, np.array(names, dtype=object)
+
 
 # ===============================
 # 3. TKINTER FORMS & MENUS 
 # ===============================
 
+def days_in_month(year, month):
+    """Returns the number of days in a month (1-12), without calendar.monthrange's tuple."""
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        return 29
+    return DAYS_PER_MONTH[month - 1]
+
+@cache
+def month_day_labels(year, month):
+    """Returns the zero-padded day labels ("01", "02", ...) for a month, computed once per month."""
+    return tuple(str(d).zfill(2) for d in range(1, days_in_month(year, month) + 1))
+
+def get_tk_root():
+    """
+    Returns the application's one Tk root, creating it (withdrawn) on first use.
+    Every screen is a Toplevel on this root, so the Tcl interpreter is started and
+    the ttk theme is set up once instead of on every navigation.
+    """
+    global _TK_ROOT
+    if _TK_ROOT is None:
+        _TK_ROOT = tk.Tk()
+        _TK_ROOT.withdraw()
+
+        # Widget colours and fonts live in named ttk styles, set once here, so each
+        # widget is created with one style name instead of a set of per-widget options.
+        # "X.Cyber.TLabel" inherits every option of "Cyber.TLabel" and overrides a few.
+        style = ttk.Style(_TK_ROOT)
+        style.theme_use('clam') # Theme that honours custom colours
+        style.configure("Cyber.TLabel", background=BG_COLOR, foreground=FG_COLOR, font=UI_FONT)
+        style.configure("Title.Cyber.TLabel", font=TITLE_FONT)
+        style.configure("Menu.Cyber.TLabel", font=MENU_FONT)
+        style.configure("Accent.Cyber.TLabel", foreground=ACCENT_COLOR)
+        style.configure("Cyber.TEntry", fieldbackground=FIELD_BG_COLOR, foreground=FG_COLOR, insertcolor=FG_COLOR, bordercolor=FG_COLOR)
+        style.configure("Cyber.TButton", background=FG_COLOR, foreground=BG_COLOR, font=UI_FONT, borderwidth=0)
+        style.map("Cyber.TButton", background=[('active', ACTIVE_COLOR)])
+        style.configure("Accent.Cyber.TButton", background=ACCENT_COLOR)
+        style.map("Accent.Cyber.TButton", background=[('active', '#B3008F')])
+        style.configure("Menu.Cyber.TButton", font=MENU_FONT, padding=(0, 10))
+        style.configure("MainMenu.Cyber.TButton", font=TITLE_FONT, padding=(0, 10))
+        style.configure("Cyber.Treeview", background=FIELD_BG_COLOR, fieldbackground=FIELD_BG_COLOR, foreground=FG_COLOR, font=UI_FONT, borderwidth=0)
+        style.configure("Cyber.Treeview.Heading", background=BG_COLOR, foreground=ACCENT_COLOR, font=UI_FONT)
+    return _TK_ROOT
+
+def create_paged_table(parent, columns, rows, row_values):
+    """Packs a sortable, paged Treeview of rows into parent; columns are (key, heading, width), row_values(row) gives the cells."""
+    table_frame = tk.Frame(parent, bg=BG_COLOR)
+    table_frame.pack(pady=10, padx=10, fill=tk.BOTH, expand=True)
+
+    tree = ttk.Treeview(table_frame, columns=[c[0] for c in columns], show="headings", height=25, style="Cyber.Treeview")
+
+    scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tree.yview)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    view = list(rows) # Rows in display order; the first rows_loaded are in the tree
+    rows_loaded = [0] # Number of rows inserted into the tree so far
+    page_pending = [False]
+    sort_state = [None, False] # Column index the view is sorted by, and whether it is descending
+
+    def load_next_page():
+        page_pending[0] = False
+        if not tree.winfo_exists():
+            return # Window closed before the idle callback ran
+        start = rows_loaded[0]
+        end = min(start + TABLE_PAGE_SIZE, len(view))
+        for row in view[start:end]:
+            tree.insert('', tk.END, values=row_values(row))
+        rows_loaded[0] = end
+
+    def request_page():
+        # Scroll callbacks fire in bursts during redraws; queue one page load for idle time
+        if not page_pending[0]:
+            page_pending[0] = True
+            tree.after_idle(load_next_page)
+
+    def on_scroll(first, last):
+        scrollbar.set(first, last)
+        # Nearing the end of the loaded rows: fetch the next page
+        if float(last) > 0.9 and rows_loaded[0] < len(view):
+            request_page()
+
+    def sort_by(col):
+        descending = sort_state == [col, False]
+        sort_state[:] = [col, descending]
+        view.sort(key=lambda row: row_values(row)[col], reverse=descending)
+        # Reload from the top in the new order
+        tree.delete(*tree.get_children())
+        rows_loaded[0] = 0
+        load_next_page()
+        tree.yview_moveto(0)
+
+    def remove_row(row):
+        pos = view.index(row)
+        del view[pos]
+        if pos < rows_loaded[0]:
+            tree.delete(tree.get_children()[pos])
+            rows_loaded[0] -= 1
+
+    for col, (key, heading, width) in enumerate(columns):
+        tree.heading(key, text=heading, anchor="w", command=partial(sort_by, col))
+        tree.column(key, width=width, anchor="w")
+
+    tree.configure(yscrollcommand=on_scroll)
+    request_page()
+    return tree, remove_row
+
+def appointment_row(appt):
+    """Returns the APPOINTMENT_COLUMNS cells for an appointment."""
+    return (appt['id'], appt['name'], appt['date'], appt['time'], appt.get('doctor', 'Unassigned'), appt['reason'])
+
+def doctor_row(name):
+    """Returns the DOCTOR_COLUMNS cells for a doctor."""
+    data = DOCTOR_RECORDS[name]
+    schedule_info = data.get('schedule', {})
+    
+    # Retrieve the new schedule format
+    days = schedule_info.get('days', ['N/A'])
+    # Only show first 3 days for compact view
+    days_str = ", ".join(days[:3]) + ('...' if len(days) > 3 else '')
+    hours_str = f"{schedule_info.get('start_time', 'N/A')}-{schedule_info.get('end_time', 'N/A')}"
+    return (name, data['specialization'], hours_str, days_str, data['contact'])
+
+def add_labeled_entry(parent, row, label_text, columnspan=1, sticky=""):
+    """Grids a "label: [entry]" pair on the given form row and returns the entry."""
+    ttk.Label(parent, text=f"{label_text}:", style="Cyber.TLabel").grid(row=row, column=0, padx=10, pady=5, sticky="w")
+    entry = ttk.Entry(parent, width=40, style="Cyber.TEntry", font=UI_FONT)
+    entry.grid(row=row, column=1, columnspan=columnspan, padx=10, pady=5, sticky=sticky)
+    return entry
+
+def create_option_menu(parent, variable, values, default_value, width=5):
+    """
+    Returns a styled dropdown over values, like tk.OptionMenu. Built from a Menubutton
+    and Menu that get their styling at creation, rather than an OptionMenu followed by
+    separate config() passes on the button and its menu.
+    """
+    variable.set(default_value)
+    button = tk.Menubutton(parent, textvariable=variable, width=width, indicatoron=True, bg=FIELD_BG_COLOR, fg=FG_COLOR,
+                           bd=1, relief="solid", highlightthickness=0, activebackground=ACTIVE_COLOR,
+                           activeforeground=BG_COLOR, font=UI_FONT)
+    menu = tk.Menu(button, tearoff=0, bg=FIELD_BG_COLOR, fg=FG_COLOR, font=UI_FONT)
+    for value in values:
+        menu.add_command(label=value, command=tk._setit(variable, value))
+    button["menu"] = menu
+    return button
+
+def run_from_menu(menu, screen):
+    """Hides a menu window while another screen runs, then shows the menu again."""
+    menu.withdraw()
+    try:
+        screen()
+    finally:
+        menu.deiconify()
+
 def create_registration_form():
     """Creates a Tkinter form to collect new patient data."""
-    root = tk.Tk()
+    root = tk.Toplevel(get_tk_root())
     root.title("Patient Registration Form (DATA INPUT)")
     root.geometry("600x400") # Smaller geometry for this form
     
     # Custom styling
-    root.configure(bg="#0D1117") # Dark background
-    font_style = tkfont.Font(family="Consolas", size=10)
+    root.configure(bg=BG_COLOR) # Dark background
     
     form_data = {}
 
@@ -218,27 +865,25 @@ def create_registration_form():
     entries = {}
 
     for i, (label_text, key) in enumerate(fields):
-        # Labels
-        tk.Label(root, text=f"{label_text}:", bg="#0D1117", fg="#00FFCC", font=font_style).grid(row=i, column=0, padx=10, pady=5, sticky="w")
-        # Entries
-        entry = tk.Entry(root, width=40, bg="#21262D", fg="#00FFCC", insertbackground="#00FFCC", bd=1, relief="solid", font=font_style)
-        entry.grid(row=i, column=1, padx=10, pady=5)
-        entries[key] = entry
+        entries[key] = add_labeled_entry(root, i, label_text)
 
     def submit():
-        data = {key: entry.get().strip() for key, entry in entries.items()}
-        
-        if not all(data.values()):
-            messagebox.showerror("Error", "All fields must be filled.")
-            return
+        # Stop at the first empty field and name it
+        data = {}
+        for label_text, key in fields:
+            value = entries[key].get().strip()
+            if not value:
+                messagebox.showerror("Error", f"Field '{label_text}' must be filled.", parent=root)
+                return
+            data[key] = value
 
         name = data["name"]
         if name.lower() == "unknown" or not name:
-             messagebox.showerror("Error", "Name cannot be 'Unknown' or empty.")
+             messagebox.showerror("Error", "Name cannot be 'Unknown' or empty.", parent=root)
              return
 
         if name in PATIENT_RECORDS:
-             messagebox.showerror("Error", f"Patient ID '{name}' already exists. Use the Existing User flow to update records.")
+             messagebox.showerror("Error", f"Patient ID '{name}' already exists. Use the Existing User flow to update records.", parent=root)
              return
 
         form_data["name"] = name
@@ -252,11 +897,10 @@ def create_registration_form():
         root.destroy()
 
     # Button
-    button_style = {'bg': '#00FFCC', 'fg': '#0D1117', 'activebackground': '#00B38F', 'activeforeground': '#0D1117', 'bd': 0, 'font': font_style}
-    tk.Button(root, text="Register & Capture Face Data", command=submit, **button_style).grid(row=len(fields), column=0, columnspan=2, pady=15, padx=10, sticky="ew")
+    ttk.Button(root, text="Register & Capture Face Data", command=submit, style="Cyber.TButton").grid(row=len(fields), column=0, columnspan=2, pady=15, padx=10, sticky="ew")
     
     root.protocol("WM_DELETE_WINDOW", lambda: (root.destroy(), form_data.clear())) # Clear data if window is closed
-    root.mainloop() 
+    root.wait_window()
     return form_data
     
 
@@ -266,12 +910,11 @@ def create_appointment_form():
     and a 12-hour clock (H, M, AM/PM). Also includes Doctor selection.
     """
     global DOCTOR_RECORDS
-    root = tk.Tk()
+    root = tk.Toplevel(get_tk_root())
     root.title("Appointment Booking System")
     root.geometry("600x400") # Smaller geometry
     
-    root.configure(bg="#0D1117") 
-    font_style = tkfont.Font(family="Consolas", size=10)
+    root.configure(bg=BG_COLOR) 
     
     # Global variables for drop-down management
     year_var = tk.StringVar(root)
@@ -282,139 +925,136 @@ def create_appointment_form():
     ampm_var = tk.StringVar(root)
     doctor_var = tk.StringVar(root) # Doctor selection
 
-    # Helper to create styled OptionMenus
-    def create_option_menu(parent, variable, values, default_value, width=5):
-        variable.set(default_value)
-        menu = tk.OptionMenu(parent, variable, *values)
-        menu.config(width=width, bg="#21262D", fg="#00FFCC", bd=1, relief="solid", highlightthickness=0, 
-                   activebackground="#00B38F", activeforeground="#0D1117", font=font_style)
-        menu["menu"].config(bg="#21262D", fg="#00FFCC", font=font_style)
-        return menu
-
     # --- 1. Patient Name and Reason ---
-    tk.Label(root, text="Patient Name/ID:", bg="#0D1117", fg="#00FFCC", font=font_style).grid(row=0, column=0, padx=10, pady=5, sticky="w")
-    patient_entry = tk.Entry(root, width=40, bg="#21262D", fg="#00FFCC", insertbackground="#00FFCC", bd=1, relief="solid", font=font_style)
-    patient_entry.grid(row=0, column=1, columnspan=3, padx=10, pady=5, sticky="ew")
-
-    tk.Label(root, text="Appointment Type/Reason:", bg="#0D1117", fg="#00FFCC", font=font_style).grid(row=1, column=0, padx=10, pady=5, sticky="w")
-    reason_entry = tk.Entry(root, width=40, bg="#21262D", fg="#00FFCC", insertbackground="#00FFCC", bd=1, relief="solid", font=font_style)
-    reason_entry.grid(row=1, column=1, columnspan=3, padx=10, pady=5, sticky="ew")
+    patient_entry = add_labeled_entry(root, 0, "Patient Name/ID", columnspan=3, sticky="ew")
+    reason_entry = add_labeled_entry(root, 1, "Appointment Type/Reason", columnspan=3, sticky="ew")
 
     # --- 2. Date Selection (Year, Month, Day) ---
-    tk.Label(root, text="Date:", bg="#0D1117", fg="#00FFCC", font=font_style).grid(row=2, column=0, padx=10, pady=5, sticky="w")
+    ttk.Label(root, text="Date:", style="Cyber.TLabel").grid(row=2, column=0, padx=10, pady=5, sticky="w")
     
     # Date Frame
-    date_frame = tk.Frame(root, bg="#0D1117")
+    date_frame = tk.Frame(root, bg=BG_COLOR)
     date_frame.grid(row=2, column=1, columnspan=3, padx=10, pady=5, sticky="w")
     
+    # Read the clock once so the year/month/day defaults always agree (e.g. around midnight)
+    now = datetime.now()
+
     # Year Dropdown (Current year + 10 years)
-    current_year = datetime.now().year
+    current_year = now.year
     years = [str(y) for y in range(current_year, current_year + 11)]
     year_menu = create_option_menu(date_frame, year_var, years, str(current_year), width=6)
     year_menu.pack(side=tk.LEFT)
     
     # Month Dropdown (Month Names)
-    month_names = list(calendar.month_abbr)[1:] # Jan, Feb, Mar...
-    month_menu = create_option_menu(date_frame, month_var, month_names, calendar.month_abbr[datetime.now().month], width=6)
+    month_menu = create_option_menu(date_frame, month_var, MONTH_NAMES, MONTH_NAMES[now.month - 1], width=6)
     month_menu.pack(side=tk.LEFT, padx=(5, 5))
 
     # Day Dropdown (Dynamic)
-    day_menu = tk.OptionMenu(date_frame, day_var, "") # Placeholder
-    day_menu.config(width=4, bg="#21262D", fg="#00FFCC", bd=1, relief="solid", highlightthickness=0, 
-                   activebackground="#00B38F", activeforeground="#0D1117", font=font_style)
-    day_menu["menu"].config(bg="#21262D", fg="#00FFCC", font=font_style)
+    day_menu = create_option_menu(date_frame, day_var, (), "", width=4) # Filled by update_days
     day_menu.pack(side=tk.LEFT)
+    day_items = day_menu.nametowidget(day_menu["menu"])
+    days_shown = [0] # Number of day entries currently in the menu
+    update_pending = [None] # Tk "after" id of the scheduled update, if any
     
-    def update_days(*args):
+    def update_days():
+        update_pending[0] = None
         try:
             selected_year = int(year_var.get())
-            selected_month_abbr = month_var.get()
-            selected_month = month_names.index(selected_month_abbr) + 1
+            selected_month = MONTH_ABBR_TO_NUM[month_var.get()]
             
-            # Get number of days in the selected month/year
-            _, num_days = calendar.monthrange(selected_year, selected_month)
-            days = [str(d).zfill(2) for d in range(1, num_days + 1)]
+            # Get the day labels for the selected month/year
+            days = month_day_labels(selected_year, selected_month)
             
             # Preserve selected day if possible, otherwise reset
             current_day = day_var.get()
             if current_day not in days:
                 day_var.set(days[0]) # Default to the 1st
                 
-            # Update the OptionMenu with the new list of days
-            day_menu['menu'].delete(0, 'end')
-            for day in days:
-                day_menu['menu'].add_command(label=day, command=tk._setit(day_var, day))
+            # Labels always run "01".."NN", so only the tail of the menu differs between months
+            if len(days) < days_shown[0]:
+                day_items.delete(len(days), 'end')
+            for day in days[days_shown[0]:]:
+                day_items.add_command(label=day, command=tk._setit(day_var, day))
+            days_shown[0] = len(days)
                 
-        except (ValueError, IndexError):
+        except ValueError:
             pass
 
+    def schedule_update_days(*args):
+        # Debounce: each change restarts the timer, so a burst of changes (e.g. year
+        # and month set together) rebuilds the menu only once
+        if update_pending[0] is not None:
+            root.after_cancel(update_pending[0])
+        update_pending[0] = root.after(FORM_DEBOUNCE_MS, update_days)
+
     # Link the update function to changes in Year and Month
-    year_var.trace_add("write", update_days)
-    month_var.trace_add("write", update_days)
+    year_var.trace_add("write", schedule_update_days)
+    month_var.trace_add("write", schedule_update_days)
     
     # Initial call to populate the day list
     update_days()
-    day_var.set(str(datetime.now().day).zfill(2)) # Default to today's day
+    day_var.set(str(now.day).zfill(2)) # Default to today's day
 
     # --- 3. Time Selection (12-Hour Clock) ---
-    tk.Label(root, text="Time:", bg="#0D1117", fg="#00FFCC", font=font_style).grid(row=3, column=0, padx=10, pady=5, sticky="w")
+    ttk.Label(root, text="Time:", style="Cyber.TLabel").grid(row=3, column=0, padx=10, pady=5, sticky="w")
 
     # Time Frame
-    time_frame = tk.Frame(root, bg="#0D1117")
+    time_frame = tk.Frame(root, bg=BG_COLOR)
     time_frame.grid(row=3, column=1, columnspan=3, padx=10, pady=5, sticky="w")
     
     # Hour Dropdown (1-12)
     hours = [str(h).zfill(2) for h in range(1, 13)]
-    hour_menu = create_option_menu(time_frame, hour_var, hours, strftime('%I'), width=4)
+    # Time defaults come from the same clock reading as the date defaults
+    default_hour = str((now.hour - 1) % 12 + 1).zfill(2) # 24h -> 12h
+    default_ampm = "AM" if now.hour < 12 else "PM"
+    hour_menu = create_option_menu(time_frame, hour_var, hours, default_hour, width=4)
     hour_menu.pack(side=tk.LEFT)
     
-    tk.Label(time_frame, text=":", bg="#0D1117", fg="#00FFCC", font=font_style).pack(side=tk.LEFT)
+    ttk.Label(time_frame, text=":", style="Cyber.TLabel").pack(side=tk.LEFT)
 
     # Minute Dropdown (00, 15, 30, 45)
     minutes = ["00", "15", "30", "45"]
-    current_minute = strftime('%M')
-    default_minute = min(minutes, key=lambda x: abs(int(x) - int(current_minute)))
+    # Nearest quarter hour; :53-:59 stay at 45 since the hour is not rolled over
+    default_minute = minutes[min((now.minute + 7) // 15, 3)]
     minute_menu = create_option_menu(time_frame, minute_var, minutes, default_minute, width=4)
     minute_menu.pack(side=tk.LEFT)
 
     # AM/PM Dropdown
     ampm = ["AM", "PM"]
-    ampm_menu = create_option_menu(time_frame, ampm_var, ampm, strftime('%p'), width=4)
+    ampm_menu = create_option_menu(time_frame, ampm_var, ampm, default_ampm, width=4)
     ampm_menu.pack(side=tk.LEFT, padx=(10, 0))
 
     # --- 4. Assign Doctor (Using live DOCTOR_RECORDS) ---
-    doctor_names = list(DOCTOR_RECORDS.keys())
-    if not doctor_names:
-        doctor_names = ["No Doctors Registered"]
-        
-    doctor_var.set(doctor_names[0]) # Default value
+    doctor_names = sorted_doctor_names() or ("No Doctors Registered",)
     
-    tk.Label(root, text="Assign Doctor:", bg="#0D1117", fg="#00FFCC", font=font_style).grid(row=4, column=0, padx=10, pady=5, sticky="w")
+    ttk.Label(root, text="Assign Doctor:", style="Cyber.TLabel").grid(row=4, column=0, padx=10, pady=5, sticky="w")
     
-    doctor_menu = tk.OptionMenu(root, doctor_var, *doctor_names)
-    doctor_menu.config(width=37, bg="#21262D", fg="#00FFCC", bd=1, relief="solid", highlightthickness=0, 
-                        activebackground="#00B38F", activeforeground="#0D1117", font=font_style)
-    doctor_menu["menu"].config(bg="#21262D", fg="#00FFCC", font=font_style)
+    doctor_menu = create_option_menu(root, doctor_var, doctor_names, doctor_names[0], width=37)
     doctor_menu.grid(row=4, column=1, columnspan=3, padx=10, pady=5, sticky="ew")
 
     def submit():
+        # Apply a still-pending day list update so the selected day fits the month
+        if update_pending[0] is not None:
+            root.after_cancel(update_pending[0])
+            update_days()
+
         patient_name = patient_entry.get().strip()
         reason = reason_entry.get().strip()
         doctor_assigned = doctor_var.get()
         
         # 1. Basic Validation
         if not patient_name or not reason:
-            messagebox.showerror("Error", "Patient Name and Appointment Reason must be filled.")
+            messagebox.showerror("Error", "Patient Name and Appointment Reason must be filled.", parent=root)
             return
 
         if doctor_assigned == "No Doctors Registered":
-            messagebox.showerror("Error", "Cannot book appointment. Please register a doctor first via Doctor Management.")
+            messagebox.showerror("Error", "Cannot book appointment. Please register a doctor first via Doctor Management.", parent=root)
             return
             
         # 2. Convert Date Dropdowns to YYYY-MM-DD and Time to 24h HH:MM
         try:
             year = year_var.get()
-            month_index = month_names.index(month_var.get()) + 1
+            month_index = MONTH_ABBR_TO_NUM[month_var.get()]
             day = day_var.get()
             
             formatted_date = f"{year}-{str(month_index).zfill(2)}-{day}"
@@ -426,11 +1066,11 @@ def create_appointment_form():
             formatted_time = appt_datetime.strftime("%H:%M") # Store as 24h
             
             if appt_datetime < datetime.now():
-                messagebox.showerror("Error", "Appointment date/time cannot be in the past.")
+                messagebox.showerror("Error", "Appointment date/time cannot be in the past.", parent=root)
                 return
 
         except ValueError:
-            messagebox.showerror("Error", "Invalid Date or Time selection. Please ensure all drop-downs are selected.")
+            messagebox.showerror("Error", "Invalid Date or Time selection. Please ensure all drop-downs are selected.", parent=root)
             return
 
         # 3. Save Appointment
@@ -443,145 +1083,92 @@ def create_appointment_form():
         }
 
         add_appointment(data)
-        messagebox.showinfo("Success", f"Appointment booked for {patient_name} with Dr. {doctor_assigned} on {formatted_date} at {formatted_time} (24h).")
+        messagebox.showinfo("Success", f"Appointment booked for {patient_name} with Dr. {doctor_assigned} on {formatted_date} at {formatted_time} (24h).", parent=root)
         root.destroy()
 
-    button_style = {'bg': '#00FFCC', 'fg': '#0D1117', 'activebackground': '#00B38F', 'activeforeground': '#0D1117', 'bd': 0, 'font': font_style}
-    tk.Button(root, text="Confirm Appointment", command=submit, **button_style).grid(row=5, column=0, columnspan=4, pady=15, padx=10, sticky="ew")
+    ttk.Button(root, text="Confirm Appointment", command=submit, style="Cyber.TButton").grid(row=5, column=0, columnspan=4, pady=15, padx=10, sticky="ew")
     
     root.protocol("WM_DELETE_WINDOW", root.destroy)
-    root.mainloop() 
+    root.wait_window()
 
 # NEW FUNCTION: MANAGE APPOINTMENTS (View + Cancel)
 def manage_appointments_window():
     """Creates a Tkinter window to display all appointments and allow cancellation."""
     global APPOINTMENTS
-    root = tk.Tk()
+    root = tk.Toplevel(get_tk_root())
     root.title(f"Appointment Management Console ({len(APPOINTMENTS)} Pending)")
     root.geometry(TK_WINDOW_GEOMETRY) # Apply standardized geometry
     
-    # Define Cyberpunk Style
-    BG_COLOR = "#0D1117"
-    FG_COLOR = "#00FFCC"
-    
     root.configure(bg=BG_COLOR)
-    title_font = tkfont.Font(family="Consolas", size=14, weight="bold")
-    content_font = tkfont.Font(family="Consolas", size=10)
 
     # Title
-    tk.Label(root, text=":: SCHEDULED APPOINTMENTS LOG ::", bg=BG_COLOR, fg=FG_COLOR, font=title_font).pack(pady=10, padx=20)
+    ttk.Label(root, text=":: SCHEDULED APPOINTMENTS LOG ::", style="Title.Cyber.TLabel").pack(pady=10, padx=20)
     
-    # Scrolled Text Widget for displaying the list
-    # Reduced width to fit the 600px geometry
-    text_area = scrolledtext.ScrolledText(
-        root,
-        wrap=tk.WORD,
-        width=60, # Adjusted width
-        height=25,
-        bg="#21262D",
-        fg=FG_COLOR,
-        insertbackground=FG_COLOR,
-        font=content_font,
-        bd=0,
-        relief=tk.FLAT,
-        padx=10,
-        pady=10
-    )
-    text_area.pack(pady=10, padx=10)
-    
-    # Format and insert appointment data
-    if APPOINTMENTS:
-        # Adjusted header length for 60-width display (approx 65 characters)
-        header = f"{'ID':<4} | {'PATIENT ID':<15} | {'DATE':<10} | {'TIME':<6} | {'DOCTOR':<10} | REASON\n" 
-        separator = "-" * 65 + "\n"
-        text_area.insert(tk.END, header, 'header')
-        text_area.insert(tk.END, separator)
-        
-        text_area.tag_config('header', foreground="#FF00CC", font=title_font)
-        
-        for i, appt in enumerate(APPOINTMENTS):
-            # i+1 is the user-facing appointment ID
-            doctor_name = appt.get('doctor', 'Unassigned')
-            # Truncate reason for single-line display
-            reason_display = appt['reason'][:20] + '...' if len(appt['reason']) > 23 else appt['reason']
-            
-            line = (
-                f"{i+1:<4} | "
-                f"{appt['name']:<15} | "
-                f"{appt['date']:<10} | "
-                f"{appt['time']:<6} | "
-                f"{doctor_name:<10} | "
-                f"{reason_display}\n"
-            )
-            text_area.insert(tk.END, line)
-    else:
-        text_area.insert(tk.END, ":: NO CURRENT APPOINTMENTS FOUND ::")
-        
-    text_area.configure(state='disabled') # Make it read-only
+    # Table of appointments (paged, see create_paged_table)
+    tree, remove_row = create_paged_table(root, APPOINTMENT_COLUMNS, APPOINTMENTS, appointment_row)
+
+    if not APPOINTMENTS:
+        ttk.Label(root, text=":: NO CURRENT APPOINTMENTS FOUND ::", style="Cyber.TLabel").pack(before=tree.master)
     
     # CANCELLATION SECTION
     cancellation_frame = tk.Frame(root, bg=BG_COLOR)
     cancellation_frame.pack(pady=15)
     
-    tk.Label(cancellation_frame, text="CANCEL APPOINTMENT ID:", bg=BG_COLOR, fg="#FF00CC", font=content_font).pack(side=tk.LEFT, padx=(0, 10))
+    ttk.Label(cancellation_frame, text="CANCEL APPOINTMENT ID:", style="Accent.Cyber.TLabel").pack(side=tk.LEFT, padx=(0, 10))
     
-    appt_id_entry = tk.Entry(cancellation_frame, width=5, bg="#21262D", fg="#00FFCC", insertbackground="#00FFCC", bd=1, relief="solid", font=content_font)
+    appt_id_entry = ttk.Entry(cancellation_frame, width=5, style="Cyber.TEntry", font=UI_FONT)
     appt_id_entry.pack(side=tk.LEFT)
     
     def cancel_appointment():
         try:
-            # 1. Get user input (1-based index)
+            # 1. Get user input (stable appointment ID)
             appt_id = int(appt_id_entry.get().strip())
-            # Convert to 0-based list index
-            appt_index = appt_id - 1
             
             # 2. Validation
-            if appt_index < 0 or appt_index >= len(APPOINTMENTS):
-                messagebox.showerror("Error", f"Invalid Appointment ID: {appt_id}. Please enter a valid ID from the list.")
+            appt_to_cancel = APPOINTMENTS_BY_ID.get(appt_id)
+            if appt_to_cancel is None:
+                messagebox.showerror("Error", f"Invalid Appointment ID: {appt_id}. Please enter a valid ID from the list.", parent=root)
                 return
 
             # 3. Confirmation
-            appt_to_cancel = APPOINTMENTS[appt_index]
             confirm = messagebox.askyesno(
                 "Confirm Cancellation", 
-                f"Are you sure you want to cancel the appointment for:\nPatient: {appt_to_cancel['name']}\nDate: {appt_to_cancel['date']} at {appt_to_cancel['time']}?"
+                f"Are you sure you want to cancel the appointment for:\nPatient: {appt_to_cancel['name']}\nDate: {appt_to_cancel['date']} at {appt_to_cancel['time']}?",
+                parent=root
             )
             
             if confirm:
                 # 4. Deletion
-                del APPOINTMENTS[appt_index]
-                save_appointments() # Save changes to the file
+                remove_appointment(appt_to_cancel)
                 cyber_log(f"Appointment ID {appt_id} for {appt_to_cancel['name']} has been cancelled.", "SUCCESS")
-                messagebox.showinfo("Success", f"Appointment ID {appt_id} has been successfully cancelled.")
+                messagebox.showinfo("Success", f"Appointment ID {appt_id} has been successfully cancelled.", parent=root)
                 
-                # 5. Refresh the window
-                root.destroy()
-                manage_appointments_window()
+                # 5. Update the table in place (other rows keep their IDs)
+                root.title(f"Appointment Management Console ({len(APPOINTMENTS)} Pending)")
+                remove_row(appt_to_cancel)
+                appt_id_entry.delete(0, tk.END)
             
         except ValueError:
-            messagebox.showerror("Error", "Please enter a number for the Appointment ID.")
+            messagebox.showerror("Error", "Please enter a number for the Appointment ID.", parent=root)
         except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {e}")
+            messagebox.showerror("Error", f"An unexpected error occurred: {e}", parent=root)
 
-    button_style = {'bg': '#FF00CC', 'fg': '#0D1117', 'activebackground': '#B3008F', 'activeforeground': '#0D1117', 'bd': 0, 'font': content_font}
-    tk.Button(cancellation_frame, text="Cancel Selected", command=cancel_appointment, **button_style).pack(side=tk.LEFT, padx=(15, 0))
+    ttk.Button(cancellation_frame, text="Cancel Selected", command=cancel_appointment, style="Accent.Cyber.TButton").pack(side=tk.LEFT, padx=(15, 0))
     
     # Close button
-    close_button_style = {'bg': '#00FFCC', 'fg': '#0D1117', 'activebackground': '#00B38F', 'activeforeground': '#0D1117', 'bd': 0, 'font': content_font, 'width': 15}
-    tk.Button(root, text="CLOSE", command=root.destroy, **close_button_style).pack(pady=15)
+    ttk.Button(root, text="CLOSE", command=root.destroy, style="Cyber.TButton", width=15).pack(pady=15)
     
-    root.mainloop()
+    root.wait_window()
 
 def create_doctor_registration_form():
     """
     Creates a Tkinter form to collect new doctor data with segmented scheduling (Days and Times).
     """
-    root = tk.Tk()
+    root = tk.Toplevel(get_tk_root())
     root.title("Doctor Registration Form (DATA INPUT)")
     root.geometry("600x450") # Smaller geometry
     
-    root.configure(bg="#0D1117")
-    font_style = tkfont.Font(family="Consolas", size=10)
+    root.configure(bg=BG_COLOR)
     
     entries = {}
     row_idx = 0
@@ -589,17 +1176,14 @@ def create_doctor_registration_form():
     # 1. Basic Fields
     fields = [("Name (ID)", "name"), ("Specialization", "specialization"), ("Contact", "contact")]
     for i, (label_text, key) in enumerate(fields):
-        tk.Label(root, text=f"{label_text}:", bg="#0D1117", fg="#00FFCC", font=font_style).grid(row=i, column=0, padx=10, pady=5, sticky="w")
-        entry = tk.Entry(root, width=40, bg="#21262D", fg="#00FFCC", insertbackground="#00FFCC", bd=1, relief="solid", font=font_style)
-        entry.grid(row=i, column=1, padx=10, pady=5)
-        entries[key] = entry
+        entries[key] = add_labeled_entry(root, i, label_text)
         row_idx = i
     
     row_idx += 1
     
     # 2. Available Days (Checkboxes)
-    tk.Label(root, text="Available Days:", bg="#0D1117", fg="#00FFCC", font=font_style).grid(row=row_idx, column=0, padx=10, pady=5, sticky="nw")
-    days_frame = tk.Frame(root, bg="#0D1117")
+    ttk.Label(root, text="Available Days:", style="Cyber.TLabel").grid(row=row_idx, column=0, padx=10, pady=5, sticky="nw")
+    days_frame = tk.Frame(root, bg=BG_COLOR)
     days_frame.grid(row=row_idx, column=1, padx=10, pady=5, sticky="w")
     row_idx += 1
     
@@ -609,58 +1193,54 @@ def create_doctor_registration_form():
     for i, day in enumerate(days_of_week):
         var = tk.IntVar(value=0) # 0 for unchecked, 1 for checked
         chk = tk.Checkbutton(days_frame, text=day, variable=var, 
-                             bg="#0D1117", fg="#00FFCC", selectcolor="#21262D", 
-                             activebackground="#0D1117", activeforeground="#00FFCC", 
-                             font=font_style)
+                             bg=BG_COLOR, fg=FG_COLOR, selectcolor=FIELD_BG_COLOR, 
+                             activebackground=BG_COLOR, activeforeground=FG_COLOR, 
+                             font=UI_FONT)
         chk.grid(row=i // 4, column=i % 4, sticky="w")
         day_vars[day] = var
         
     # 3. Available Timings
-    tk.Label(root, text="Available Time (HH:MM):", bg="#0D1117", fg="#00FFCC", font=font_style).grid(row=row_idx, column=0, padx=10, pady=5, sticky="w")
-    time_frame = tk.Frame(root, bg="#0D1117")
+    ttk.Label(root, text="Available Time (HH:MM):", style="Cyber.TLabel").grid(row=row_idx, column=0, padx=10, pady=5, sticky="w")
+    time_frame = tk.Frame(root, bg=BG_COLOR)
     time_frame.grid(row=row_idx, column=1, padx=10, pady=5, sticky="w")
     row_idx += 1
     
-    tk.Label(time_frame, text="From:", bg="#0D1117", fg="#00FFCC", font=font_style).pack(side=tk.LEFT, padx=(0, 5))
-    start_time_entry = tk.Entry(time_frame, width=10, bg="#21262D", fg="#00FFCC", insertbackground="#00FFCC", bd=1, relief="solid", font=font_style)
+    ttk.Label(time_frame, text="From:", style="Cyber.TLabel").pack(side=tk.LEFT, padx=(0, 5))
+    start_time_entry = ttk.Entry(time_frame, width=10, style="Cyber.TEntry", font=UI_FONT)
     start_time_entry.pack(side=tk.LEFT, padx=(0, 15))
     entries["start_time"] = start_time_entry
     
-    tk.Label(time_frame, text="To:", bg="#0D1117", fg="#00FFCC", font=font_style).pack(side=tk.LEFT, padx=(0, 5))
-    end_time_entry = tk.Entry(time_frame, width=10, bg="#21262D", fg="#00FFCC", insertbackground="#00FFCC", bd=1, relief="solid", font=font_style)
+    ttk.Label(time_frame, text="To:", style="Cyber.TLabel").pack(side=tk.LEFT, padx=(0, 5))
+    end_time_entry = ttk.Entry(time_frame, width=10, style="Cyber.TEntry", font=UI_FONT)
     end_time_entry.pack(side=tk.LEFT)
     entries["end_time"] = end_time_entry
 
-    def validate_time(time_str):
-        try:
-            datetime.strptime(time_str, "%H:%M")
-            return True
-        except ValueError:
-            return False
-
     def submit():
-        data = {key: entry.get().strip() for key, entry in entries.items() if key not in ["start_time", "end_time"]}
+        # Stop at the first empty field and name it
+        data = {}
+        for label_text, key in fields + [("Available Time From", "start_time"), ("Available Time To", "end_time")]:
+            value = entries[key].get().strip()
+            if not value:
+                messagebox.showerror("Error", f"Field '{label_text}' must be filled.", parent=root)
+                return
+            data[key] = value
         
         # Collect schedule data
         available_days = [day for day, var in day_vars.items() if var.get() == 1]
-        start_time = entries["start_time"].get().strip()
-        end_time = entries["end_time"].get().strip()
-
-        if not all(data.values()) or not start_time or not end_time:
-            messagebox.showerror("Error", "Name, Specialization, Contact, and Times must be filled.")
-            return
+        start_time = data["start_time"]
+        end_time = data["end_time"]
 
         if not available_days:
-            messagebox.showerror("Error", "Please select at least one available day.")
+            messagebox.showerror("Error", "Please select at least one available day.", parent=root)
             return
 
-        if not validate_time(start_time) or not validate_time(end_time):
-            messagebox.showerror("Error", "Time format must be HH:MM (e.g., 10:00 or 17:30).")
+        if not TIME_HHMM_RE.fullmatch(start_time) or not TIME_HHMM_RE.fullmatch(end_time):
+            messagebox.showerror("Error", "Time format must be HH:MM (e.g., 10:00 or 17:30).", parent=root)
             return
             
         name = data["name"]
         if name in DOCTOR_RECORDS:
-             messagebox.showerror("Error", f"Doctor ID '{name}' already exists.")
+             messagebox.showerror("Error", f"Doctor ID '{name}' already exists.", parent=root)
              return
 
         save_doctor_record(name, {
@@ -673,187 +1253,97 @@ def create_doctor_registration_form():
             },
             "contact": data["contact"]
         })
-        messagebox.showinfo("Success", f"Dr. {name} registered successfully!")
+        messagebox.showinfo("Success", f"Dr. {name} registered successfully!", parent=root)
         root.destroy()
 
-    button_style = {'bg': '#00FFCC', 'fg': '#0D1117', 'activebackground': '#00B38F', 'activeforeground': '#0D1117', 'bd': 0, 'font': font_style}
-    tk.Button(root, text="Register Doctor", command=submit, **button_style).grid(row=row_idx, column=0, columnspan=2, pady=15, padx=10, sticky="ew")
+    ttk.Button(root, text="Register Doctor", command=submit, style="Cyber.TButton").grid(row=row_idx, column=0, columnspan=2, pady=15, padx=10, sticky="ew")
     
-    root.mainloop()
+    root.wait_window()
 
 def create_doctor_schedule_view():
     """
     Creates a Tkinter window to display all doctors and their schedules.
     """
     global DOCTOR_RECORDS
-    root = tk.Tk()
+    root = tk.Toplevel(get_tk_root())
     root.title(f"Doctor Roster and Schedules ({len(DOCTOR_RECORDS)})")
     root.geometry(TK_WINDOW_GEOMETRY) # Apply standardized geometry
     
-    # Define Cyberpunk Style
-    BG_COLOR = "#0D1117"
-    FG_COLOR = "#00FFCC"
-    
     root.configure(bg=BG_COLOR)
-    title_font = tkfont.Font(family="Consolas", size=14, weight="bold")
-    content_font = tkfont.Font(family="Consolas", size=10)
 
     # Title
-    tk.Label(root, text=":: DOCTOR ROSTER AND SCHEDULES ::", bg=BG_COLOR, fg=FG_COLOR, font=title_font).pack(pady=10, padx=20)
-    
-    # Scrolled Text Widget for displaying the list
-    # Reduced width to fit the 600px geometry
-    text_area = scrolledtext.ScrolledText(
-        root,
-        wrap=tk.WORD,
-        width=75, # Adjusted width
-        height=25,
-        bg="#21262D",
-        fg=FG_COLOR,
-        insertbackground=FG_COLOR,
-        font=content_font,
-        bd=0,
-        relief=tk.FLAT,
-        padx=10,
-        pady=10
-    )
-    text_area.pack(pady=10, padx=10)
+    ttk.Label(root, text=":: DOCTOR ROSTER AND SCHEDULES ::", style="Title.Cyber.TLabel").pack(pady=10, padx=20)
     
-    # Format and insert doctor data
-    if DOCTOR_RECORDS:
-        header = f"{'DOCTOR NAME':<15} | {'SPECIALIZATION':<15} | {'HOURS':<11} | AVAILABLE DAYS | CONTACT\n"
-        separator = "-" * 75 + "\n"
-        text_area.insert(tk.END, header, 'header')
-        text_area.insert(tk.END, separator)
-        
-        # Define a tag for the header
-        text_area.tag_config('header', foreground="#FF00CC", font=title_font)
-        
-        for name, data in sorted(DOCTOR_RECORDS.items()):
-            schedule_info = data.get('schedule', {})
-            
-            # Retrieve the new schedule format
-            days = schedule_info.get('days', ['N/A'])
-            # Only show first 3 days for compact view
-            days_str = ", ".join(days[:3]) + ('...' if len(days) > 3 else '')
-            hours_str = f"{schedule_info.get('start_time', 'N/A')}-{schedule_info.get('end_time', 'N/A')}"
-                
-            line = (
-                f"{name:<15} | "
-                f"{data['specialization']:<15} | "
-                f"{hours_str:<11} | "
-                f"{days_str:<15} | "
-                f"{data['contact']}\n"
-            )
-            text_area.insert(tk.END, line)
-    else:
-        text_area.insert(tk.END, ":: NO DOCTOR RECORDS FOUND ::")
-        
-    text_area.configure(state='disabled') # Make it read-only
+    # Table of doctors (paged, see create_paged_table)
+    tree, _ = create_paged_table(root, DOCTOR_COLUMNS, sorted_doctor_names(), doctor_row)
+    if not DOCTOR_RECORDS:
+        ttk.Label(root, text=":: NO DOCTOR RECORDS FOUND ::", style="Cyber.TLabel").pack(before=tree.master)
     
     # Close button
-    button_style = {'bg': '#00FFCC', 'fg': '#0D1117', 'activebackground': '#00B38F', 'activeforeground': '#0D1117', 'bd': 0, 'font': content_font, 'width': 15}
-    tk.Button(root, text="CLOSE", command=root.destroy, **button_style).pack(pady=15)
+    ttk.Button(root, text="CLOSE", command=root.destroy, style="Cyber.TButton", width=15).pack(pady=15)
     
-    root.mainloop()
+    root.wait_window()
 
-def doctor_management_menu():
-    """Displays the menu for doctor management actions."""
-    root = tk.Tk()
+def show_screen(root, build_screen):
+    """Swaps the menu window's contents for another screen, reusing the same window."""
+    for widget in root.winfo_children():
+        widget.destroy()
+    build_screen(root)
+
+def doctor_management_menu(root):
+    """Displays the menu for doctor management actions in the menu window."""
     root.title("ITS System: Doctor Management")
     root.geometry("500x400") # Smaller geometry for this menu
     
-    # Define Cyberpunk Style
-    BG_COLOR = "#0D1117"
-    FG_COLOR = "#00FFCC"
-    ACTIVE_COLOR = "#00B38F"
-    
-    root.configure(bg=BG_COLOR)
-    large_font = tkfont.Font(family="Consolas", size=12, weight="bold")
-    
     # Title
-    tk.Label(root, text=":: DOCTOR MANAGEMENT CONSOLE ::", bg=BG_COLOR, fg=FG_COLOR, font=large_font).pack(pady=20, padx=50)
-
-    button_style = {
-        'bg': FG_COLOR, 'fg': BG_COLOR, 
-        'activebackground': ACTIVE_COLOR, 'activeforeground': BG_COLOR, 
-        'bd': 0, 'font': large_font, 'width': 40, 'height': 2
-    }
+    ttk.Label(root, text=":: DOCTOR MANAGEMENT CONSOLE ::", style="Menu.Cyber.TLabel").pack(pady=20, padx=50)
 
-    # Commands
-    def start_doctor_registration():
-        root.destroy()
-        create_doctor_registration_form()
-        doctor_management_menu()
+    button_style = {'style': "Menu.Cyber.TButton", 'width': 40}
 
-    def start_doctor_schedule_view():
-        root.destroy()
-        create_doctor_schedule_view()
-        doctor_management_menu()
+    # Commands: each form runs with this menu hidden, which returns here when it closes
+    start_doctor_registration = partial(run_from_menu, root, create_doctor_registration_form)
+    start_doctor_schedule_view = partial(run_from_menu, root, create_doctor_schedule_view)
 
     # Buttons
-    tk.Button(root, text="Register New Doctor", command=start_doctor_registration, **button_style).pack(pady=10)
-    tk.Button(root, text="View All Doctor Information/Schedule", command=start_doctor_schedule_view, **button_style).pack(pady=10)
-    tk.Button(root, text="<< Back to Main Menu", command=lambda: (root.destroy(), main_menu()), **button_style).pack(pady=20)
-
-    root.mainloop()
+    ttk.Button(root, text="Register New Doctor", command=start_doctor_registration, **button_style).pack(pady=10)
+    ttk.Button(root, text="View All Doctor Information/Schedule", command=start_doctor_schedule_view, **button_style).pack(pady=10)
+    ttk.Button(root, text="<< Back to Main Menu", command=partial(show_screen, root, main_menu_screen), **button_style).pack(pady=20)
 
 
-def main_menu():
-    """Displays the initial menu with three options."""
-    root = tk.Tk()
+def main_menu_screen(root):
+    """Displays the initial menu options in the menu window."""
     root.title("ITS System: Main Menu")
     root.geometry(TK_WINDOW_GEOMETRY) # Apply standardized geometry
     
-    # Define Cyberpunk Style
-    BG_COLOR = "#0D1117"
-    FG_COLOR = "#00FFCC"
-    ACTIVE_COLOR = "#00B38F"
-    
-    root.configure(bg=BG_COLOR)
-    large_font = tkfont.Font(family="Consolas", size=14, weight="bold")
-    
     # Title
-    tk.Label(root, text=":: ITS SYSTEM INITIALIZER ::", bg=BG_COLOR, fg=FG_COLOR, font=large_font).pack(pady=20, padx=50)
+    ttk.Label(root, text=":: ITS SYSTEM INITIALIZER ::", style="Title.Cyber.TLabel").pack(pady=20, padx=50)
     
-    button_style = {
-        'bg': FG_COLOR, 'fg': BG_COLOR, 
-        'activebackground': ACTIVE_COLOR, 'activeforeground': BG_COLOR, 
-        'bd': 0, 'font': large_font, 'width': 30, 'height': 2
-    }
-
-    # Commands
-    def start_recognition():
-        root.destroy()
-        face_recognition_loop()
-
-    def start_registration_flow():
-        root.destroy()
-        registration_only_flow()
+    button_style = {'style': "MainMenu.Cyber.TButton", 'width': 30}
 
-    def start_appointment_flow():
-        root.destroy()
-        create_appointment_form()
-        main_menu() 
-
-    def start_appointment_manage(): # Renamed command for clarity
-        root.destroy()
-        manage_appointments_window() # Calls the new combined view/cancel window
-        main_menu() 
-        
-    def start_doctor_management(): 
-        root.destroy()
-        doctor_management_menu()
+    # Commands: each screen runs with the main menu hidden, which returns here when it closes
+    start_recognition = partial(run_from_menu, root, face_recognition_loop)
+    start_registration_flow = partial(run_from_menu, root, registration_only_flow)
+    start_appointment_flow = partial(run_from_menu, root, create_appointment_form)
+    start_appointment_manage = partial(run_from_menu, root, manage_appointments_window) # Combined view/cancel window
+    start_doctor_management = partial(show_screen, root, doctor_management_menu)
 
     # Buttons
-    tk.Button(root, text="Existing User (Start Triage)", command=start_recognition, **button_style).pack(pady=10)
-    tk.Button(root, text="Register New Patient", command=start_registration_flow, **button_style).pack(pady=10)
-    tk.Button(root, text="Appointment Booking", command=start_appointment_flow, **button_style).pack(pady=10)
-    tk.Button(root, text="Manage Appointments", command=start_appointment_manage, **button_style).pack(pady=10) # RENAME APPLIED
-    tk.Button(root, text="Doctor Management", command=start_doctor_management, **button_style).pack(pady=10)
-    tk.Button(root, text="Exit Application", command=root.quit, **button_style).pack(pady=20)
+    ttk.Button(root, text="Existing User (Start Triage)", command=start_recognition, **button_style).pack(pady=10)
+    ttk.Button(root, text="Register New Patient", command=start_registration_flow, **button_style).pack(pady=10)
+    ttk.Button(root, text="Appointment Booking", command=start_appointment_flow, **button_style).pack(pady=10)
+    ttk.Button(root, text="Manage Appointments", command=start_appointment_manage, **button_style).pack(pady=10) # RENAME APPLIED
+    ttk.Button(root, text="Doctor Management", command=start_doctor_management, **button_style).pack(pady=10)
+    ttk.Button(root, text="Exit Application", command=root.destroy, **button_style).pack(pady=20)
 
-    root.mainloop()
+def main_menu():
+    """
+    Opens the menu window and runs until it is closed. The main and doctor menus are
+    screens swapped in and out of this one window by show_screen.
+    """
+    root = tk.Toplevel(get_tk_root())
+    root.configure(bg=BG_COLOR)
+    show_screen(root, main_menu_screen)
+    root.wait_window()
 
 # ===============================
 # 4. NEW USER REGISTRATION PROCESS
@@ -865,84 +1355,91 @@ def register_new_user_process(cap, patient_data):
     Captures multiple images for a new user, encodes them, and saves the data.
     """
     global KNOWN_ENCODINGS, KNOWN_NAMES
+    face_recognition = load_face_recognition()
 
     new_name = patient_data["name"]
     name_folder = os.path.join(KNOWN_FACES_DIR, new_name)
     os.makedirs(name_folder, exist_ok=True)
     
-    new_encodings = []
+    # Encodings are written straight into a fixed buffer as captures succeed
+    enc_buf = np.empty((NUM_REGISTRATION_IMAGES, ENCODING_DIM), dtype=np.float32)
+    count = 0
+    captures = 0
     
-    for i in range(NUM_REGISTRATION_IMAGES):
-        message = f"Capturing image {i + 1}/{NUM_REGISTRATION_IMAGES} for {new_name}. Please look at the camera."
-        cyber_log(message, "INFO")
-        
-        # Display feedback in OpenCV window
-        ret, frame = cap.read()
-        if frame is None or not ret:
-            cyber_log("Could not read frame from camera.", "WARNING")
-            continue
+    while count < NUM_REGISTRATION_IMAGES and captures < REGISTRATION_MAX_CAPTURES:
+        # 1. Capture a burst of the still-missing frames; detection runs afterwards as one batch
+        captured_frames = []
+        for k in range(min(NUM_REGISTRATION_IMAGES - count, REGISTRATION_MAX_CAPTURES - captures)):
+            captures += 1
+            message = f"Capturing image {count + k + 1}/{NUM_REGISTRATION_IMAGES} for {new_name}. Please look at the camera."
+            cyber_log(message, "INFO")
         
-        display_frame = frame.copy()
-        H, W, _ = display_frame.shape
-        cv2.putText(display_frame, message, (10, H - 10), FONT, 0.7, (255, 255, 0), 2)
-        cv2.imshow(f"ITS Registration Monitor - {new_name}", display_frame) 
-        cv2.waitKey(2000) # Wait 2 seconds for subject to prepare
-
-        # Processing the captured image
-        ret, frame = cap.read()
-        if not ret:
-            continue
-        
-        rgb_small_frame = cv2.cvtColor(cv2.resize(frame, (0, 0), fx=FRAME_RESIZE_SCALE, fy=FRAME_RESIZE_SCALE), cv2.COLOR_BGR2RGB)
-        face_locations = face_recognition.face_locations(rgb_small_frame, model=MODEL)
+            # Display feedback in OpenCV window
+            ret, frame = cap.read()
+            if frame is None or not ret:
+                cyber_log("Could not read frame from camera.", "WARNING")
+                continue
         
-        if len(face_locations) == 1:
-            face_encoding = face_recognition.face_encodings(rgb_small_frame, face_locations)[0]
-            new_encodings.append(face_encoding)
-            
-            img_path = os.path.join(name_folder, f"{new_name}_{i+1}.jpg")
-            cv2.imwrite(img_path, frame)
-            cyber_log(f"Image and encoding captured and saved: {img_path}", "SUCCESS")
-        else:
-            cyber_log("Found 0 or multiple faces. Retaking this capture...", "WARNING")
-            # To ensure we get NUM_REGISTRATION_IMAGES successful captures, decrement i
-            i -= 1 
-            # Force another loop iteration if capture failed
-            continue
+            display_frame = frame.copy()
+            H, W, _ = display_frame.shape
+            cv2.putText(display_frame, message, (10, H - 10), FONT, 0.7, (255, 255, 0), 2)
+            cv2.imshow(f"ITS Registration Monitor - {new_name}", display_frame) 
+            cv2.waitKey(2000) # Wait 2 seconds for subject to prepare
+
+            # Grab the image to process
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            captured_frames.append(frame)
+
+        # 2. Detect faces in all captures at once, then encode the usable ones
+        small_frames = [downscale_frame(frame) for frame in captured_frames]
+        all_face_locations = detect_faces_batch(small_frames)
+
+        for frame, small_frame, face_locations in zip(captured_frames, small_frames, all_face_locations):
+            if len(face_locations) == 1:
+                rgb_small_frame = bgr_to_rgb(small_frame)
+                enc_buf[count] = face_recognition.face_encodings(rgb_small_frame, face_locations)[0]
+                count += 1
+                
+                img_path = os.path.join(name_folder, f"{new_name}_{count}.jpg")
+                cv2.imwrite(img_path, frame)
+                cyber_log(f"Image and encoding captured and saved: {img_path}", "SUCCESS")
+            else:
+                cyber_log("Found 0 or multiple faces in a capture. Retaking it.", "WARNING")
 
     cv2.destroyWindow(f"ITS Registration Monitor - {new_name}")
 
-    if not new_encodings:
+    if count == 0:
         messagebox.showerror("Error", "Failed to capture sufficient images for registration.")
         return 
 
     # Calculate average encoding from successful captures
-    avg_encoding = np.mean(new_encodings, axis=0)
+    avg_encoding = enc_buf[:count].mean(axis=0)
     
-    # Update global lists
-    KNOWN_ENCODINGS.append(avg_encoding)
-    KNOWN_NAMES.append(new_name)
+    # Update global encodings matrix and names
+    KNOWN_ENCODINGS = np.vstack([KNOWN_ENCODINGS, avg_encoding])
+    KNOWN_NAMES = np.append(KNOWN_NAMES, new_name)
 
     # Save to disk
     save_encodings(KNOWN_ENCODINGS, KNOWN_NAMES)
     save_patient_record(new_name, patient_data["details"])
+    index_known_faces()
 
     messagebox.showinfo("Success", f"Registration complete for {new_name}.")
 
 def registration_only_flow():
-    """Manages the full registration workflow: Form -> Camera -> Save -> Relaunch Menu."""
+    """Manages the full registration workflow: Form -> Camera -> Save."""
     cyber_log("Initiating manual registration flow...", "INFO")
     
     # 1. Pop up the GUI form to collect data
     patient_data_from_form = create_registration_form() 
     
     if patient_data_from_form:
-        cap = cv2.VideoCapture(0)
+        cap = open_camera()
         if not cap.isOpened():
             cyber_log("Cannot open webcam for registration.", "CRITICAL")
             messagebox.showerror("Error", "Could not access the webcam.")
-            # Relaunch main menu on failure
-            main_menu() 
             return
 
         try:
@@ -950,20 +1447,97 @@ def registration_only_flow():
             register_new_user_process(cap, patient_data_from_form)
         finally:
             cap.release()
-            
-    # Relaunch main menu after process is done (or if user canceled the form)
-    main_menu()
     
 # ===============================
 # 5. CORE FACE RECOGNITION LOOP (CV2 Console UI)
 # ===============================
+
+def start_frame_reader(cap, max_queued):
+    """
+    Reads frames from cap on a background thread, so capture overlaps processing.
+    Returns (take_frames, stop). take_frames() blocks until a frame is queued and
+    returns every queued frame, oldest first (an empty list once the camera stops).
+    At most max_queued frames are held; older ones are dropped. stop() ends the thread.
+    """
+    queued = deque(maxlen=max_queued)
+    ready = threading.Condition()
+    running = [True]
+
+    def read_loop():
+        while running[0]:
+            ret, frame = cap.read()
+            with ready:
+                if ret:
+                    queued.append(frame)
+                else:
+                    running[0] = False
+                ready.notify()
+
+    def take_frames():
+        with ready:
+            ready.wait_for(lambda: queued or not running[0])
+            frames = list(queued)
+            queued.clear()
+        return frames
+
+    def stop():
+        running[0] = False
+        reader.join() # The capture must not be released mid-read
+
+    reader = threading.Thread(target=read_loop, daemon=True)
+    reader.start()
+    return take_frames, stop
+
+@cache
+def render_label(text, scale, color, thickness):
+    """
+    Rasterizes a fixed overlay label once. Returns the bitmap and the offset of the
+    text origin inside it, so later draws are a plain array copy instead of putText.
+    """
+    (text_w, text_h), baseline = cv2.getTextSize(text, FONT, scale, thickness)
+    pad = thickness # Strokes spill slightly outside the reported text box
+    bitmap = np.zeros((text_h + baseline + 2 * pad, text_w + 2 * pad, 3), dtype=np.uint8)
+    cv2.putText(bitmap, text, (pad, text_h + pad), FONT, scale, color, thickness)
+    return bitmap, (pad, text_h + pad)
+
+@cache
+def wrap_text(text, scale, max_width):
+    """
+    Greedily wraps text into lines narrower than max_width pixels at the given font scale.
+    Measured once per distinct text, since the same patient's text is drawn every frame.
+    """
+    lines = []
+    current_line = ""
+    for word in text.split():
+        text_size, _ = cv2.getTextSize(current_line + " " + word, FONT, scale, 1)
+        if text_size[0] < max_width:
+            current_line += " " + word
+        else:
+            lines.append(current_line.strip())
+            current_line = word
+    lines.append(current_line.strip())
+    return tuple(lines)
+
+def draw_label(image, text, org, scale, color, thickness):
+    """Same result as cv2.putText on a black background, using the cached bitmap for the label."""
+    bitmap, (origin_x, origin_y) = render_label(text, scale, color, thickness)
+    left, top = org[0] - origin_x, org[1] - origin_y
+    H, W = image.shape[:2]
+    # Clip the bitmap against the image borders
+    y0, x0 = max(top, 0), max(left, 0)
+    y1, x1 = min(top + bitmap.shape[0], H), min(left + bitmap.shape[1], W)
+    if y0 < y1 and x0 < x1:
+        image[y0:y1, x0:x1] = bitmap[y0 - top:y1 - top, x0 - left:x1 - left]
+
+
 def face_recognition_loop():
     """
     Main CV2 loop for real-time face recognition and triage.
     """
     global KNOWN_ENCODINGS, KNOWN_NAMES, APPOINTMENTS
+    face_recognition = load_face_recognition()
     
-    cap = cv2.VideoCapture(0)
+    cap = open_camera()
     if not cap.isOpened():
         cyber_log("Cannot open webcam.", "CRITICAL")
         messagebox.showerror("Error", "Could not access the webcam.")
@@ -979,168 +1553,211 @@ def face_recognition_loop():
     GRAY_TEXT = (200, 200, 200)
     APPOINTMENT_COLOR = (255, 100, 0) # Orange/Blue for appointments
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        # Resize frame for faster processing
-        rgb_small_frame = cv2.cvtColor(cv2.resize(frame, (0, 0), fx=FRAME_RESIZE_SCALE, fy=FRAME_RESIZE_SCALE), cv2.COLOR_BGR2RGB)
+    def render_panel_template(H):
+        """
+        Draws the info panel parts that never change (borders, fixed section titles, footer
+        label) once, at the positions the per-frame layout below puts them.
+        """
+        template = np.zeros((H, INFO_PANEL_WIDTH, 3), dtype=np.uint8)
+        cv2.line(template, (0, 0), (INFO_PANEL_WIDTH, 0), NEON_CYAN, 3)
+        cv2.line(template, (0, H-1), (INFO_PANEL_WIDTH, H-1), NEON_CYAN, 3)
+        draw_label(template, ":: ITS TRIAGE CONSOLE ::", (20, 40), 0.7, NEON_CYAN, 2)
+        cv2.line(template, (20, 70), (INFO_PANEL_WIDTH - 20, 70), (50, 50, 50), 1)
+        draw_label(template, ":: HISTORY LOG ::", (20, 275), 0.6, NEON_CYAN, 1)
+        draw_label(template, "SYSTEM ONLINE", (INFO_PANEL_WIDTH - 150, H - 20), 0.6, NEON_GREEN, 1)
+        return template
+
+    frame_counter = 0
+    recognized_faces = [] # (face box, name, label, record) for each face found in the last processed frame
+    # Downscaled and RGB frames are written into buffers reused across iterations instead of fresh allocations
+    small_buffers = []
+    rgb_buffer = None
+    panel_template = None
+    combined_frame = None # Webcam feed and info panel side by side, reused rather than allocated per frame
+    cached_panel = None # Fully drawn panel (without the clock) for the identity last shown
+    cached_panel_key = None
+
+    # Frames are read on a background thread. The CNN detector takes a whole queue of
+    # frames in one GPU call; other detectors gain nothing from a backlog, so only the
+    # newest frame is kept for them.
+    take_frames, stop_reader = start_frame_reader(cap, DETECT_BATCH if MODEL == "cnn" else 1)
+    running = True
+
+    while running:
+        batch = take_frames()
+        if not batch:
+            break # Camera stopped delivering frames
         
-        # Find all faces and their encodings
-        face_locations = face_recognition.face_locations(rgb_small_frame, model=MODEL)
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
-
         # --- Recognition Logic & Data Retrieval ---
-        patient_name_to_display = "Unknown"
-        current_details = {}
-
-        for face_encoding, face_loc in zip(face_encodings, face_locations):
-            name = "Unknown"
-            
-            if KNOWN_ENCODINGS:
-                matches = face_recognition.compare_faces(KNOWN_ENCODINGS, face_encoding, TOLERANCE)
-                if True in matches:
-                    match_index = np.argmin(face_recognition.face_distance(KNOWN_ENCODINGS, face_encoding))
-                    name = KNOWN_NAMES[match_index]
-            
-            # The last recognized face's data will populate the panel
-            patient_name_to_display = name
-
-            # Scale face locations back to original frame size
-            top, right, bottom, left = [v * int(1 / FRAME_RESIZE_SCALE) for v in face_loc]
-
-            # Draw box and label
-            color = NEON_GREEN if name != "Unknown" else CRITICAL_RED_BGR
-            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-            cv2.rectangle(frame, (left, bottom - 25), (right, bottom), color, cv2.FILLED)
-            cv2.putText(frame, name.upper(), (left + 6, bottom - 6), FONT, 0.6, (255, 255, 255), 1)
-
-
-        # --- Determine Triage Panel Data ---
-        if patient_name_to_display != "Unknown" and patient_name_to_display in PATIENT_RECORDS:
-            current_details = PATIENT_RECORDS[patient_name_to_display]
-        else:
-            current_details = {
-                "age": "N/A", "gender": "N/A", 
-                "allergies": "Unknown", "history": "No record found.", 
-                "last_visit": "N/A"
-            }
-
-        # --- Find Appointments for the Recognized Patient ---
-        current_appointments = [
-            app for app in APPOINTMENTS 
-            if app['name'].lower() == patient_name_to_display.lower()
-        ]
+        # Detection and encoding dominate the frame cost, so they only run every FRAME_SKIP frames
+        due = [i for i in range(len(batch)) if (frame_counter + i) % FRAME_SKIP == 0]
+        # Resize frames for faster processing
+        small_frames = []
+        for slot, i in enumerate(due):
+            if slot < len(small_buffers):
+                small_frames.append(downscale_frame(batch[i], small_buffers[slot]))
+            else:
+                small_buffers.append(downscale_frame(batch[i])) # First use of this slot allocates its buffer
+                small_frames.append(small_buffers[-1])
+        # Find all faces in every due frame at once, then their encodings
+        batch_results = {}
+        for i, small_frame, face_locations in zip(due, small_frames, detect_faces_batch(small_frames)):
+            faces = []
+            # Empty scenes are common while idle; skip the colour copy and encoder call for them
+            if face_locations:
+                # The encoder still needs colour input
+                rgb_small_frame = rgb_buffer = bgr_to_rgb(small_frame, rgb_buffer)
+                face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+
+                for face_encoding, face_loc in zip(face_encodings, face_locations):
+                    # Scale face locations back to original frame size (once per detection, not per drawn frame)
+                    face_box = tuple(v * int(1 / FRAME_RESIZE_SCALE) for v in face_loc)
+                    match_index = match_face(face_encoding)
+                    if match_index is None:
+                        faces.append((face_box, "Unknown", "UNKNOWN", None))
+                    else:
+                        faces.append((face_box, KNOWN_NAMES[match_index], KNOWN_LABELS[match_index], KNOWN_RECORDS[match_index]))
+            batch_results[i] = faces
+        frame_counter += len(batch)
+
+        for i, frame in enumerate(batch):
+            recognized_faces = batch_results.get(i, recognized_faces)
+            patient_name_to_display = "Unknown"
+            patient_record_to_display = None
+            current_details = {}
+
+            for (top, right, bottom, left), name, label, record in recognized_faces:
+                # The last recognized face's data will populate the panel
+                patient_name_to_display = name
+                patient_record_to_display = record
+
+                # Draw box and label
+                color = NEON_GREEN if name != "Unknown" else CRITICAL_RED_BGR
+                cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+                cv2.rectangle(frame, (left, bottom - 25), (right, bottom), color, cv2.FILLED)
+                cv2.putText(frame, label, (left + 6, bottom - 6), FONT, 0.6, (255, 255, 255), 1)
+
+            # --- Determine Triage Panel Data ---
+            if patient_record_to_display is not None:
+                current_details = patient_record_to_display
+            else:
+                current_details = {
+                    "age": "N/A", "gender": "N/A", 
+                    "allergies": "Unknown", "history": "No record found.", 
+                    "last_visit": "N/A"
+                }
+
+            # --- Find Appointments for the Recognized Patient ---
+            current_appointments = APPOINTMENTS_BY_NAME.get(patient_name_to_display.lower(), ())
         
 
-        # --- Create and Draw Info Panel (Cyberpunk Aesthetic) ---
-        H, W, _ = frame.shape
-        # Create a solid black info panel
-        info_panel = np.zeros((H, INFO_PANEL_WIDTH, 3), dtype=np.uint8)
-        
-        panel_x = 20
-        panel_y = 40
-        line_height = 30
-        
-        # Draw Border and Title
-        cv2.line(info_panel, (0, 0), (INFO_PANEL_WIDTH, 0), NEON_CYAN, 3)
-        cv2.line(info_panel, (0, H-1), (INFO_PANEL_WIDTH, H-1), NEON_CYAN, 3)
+            # --- Create and Draw Info Panel (Cyberpunk Aesthetic) ---
+            H, W, _ = frame.shape
+            # Start from the static panel graphics, rendered once per frame height
+            if panel_template is None or panel_template.shape[0] != H:
+                panel_template = render_panel_template(H)
+            if combined_frame is None or combined_frame.shape[:2] != (H, W + INFO_PANEL_WIDTH):
+                combined_frame = np.empty((H, W + INFO_PANEL_WIDTH, 3), dtype=np.uint8)
+            # The panel is drawn straight into the right-hand side of the combined frame
+            info_panel = combined_frame[:, W:]
+            panel_x = 20
+
+            # The panel only changes with the identity on screen (or the day, for the TODAY
+            # highlight), so it is drawn once per identity and reused; only the clock is redrawn
+            today = datetime.now().date()
+            panel_key = (patient_name_to_display, today, H)
+            if panel_key == cached_panel_key:
+                np.copyto(info_panel, cached_panel)
+            else:
+                np.copyto(info_panel, panel_template)
+                panel_y = 40
+                line_height = 30
         
-        cv2.putText(info_panel, ":: ITS TRIAGE CONSOLE ::", (panel_x, panel_y), FONT, 0.7, NEON_CYAN, 2)
-        panel_y += line_height + 5
-        cv2.line(info_panel, (panel_x, panel_y - 5), (INFO_PANEL_WIDTH - panel_x, panel_y - 5), (50, 50, 50), 1)
-
-        # PATIENT DETAILS SECTION
-        name = patient_name_to_display
-        color = NEON_CYAN if name != "Unknown" else CRITICAL_RED_BGR
-        status_text = "ID: " + name.upper()
+                # Border and Title (pre-rendered)
+                panel_y += line_height + 5
+
+                # PATIENT DETAILS SECTION
+                name = patient_name_to_display
+                color = NEON_CYAN if name != "Unknown" else CRITICAL_RED_BGR
+                status_text = "ID: " + name.upper()
         
-        cv2.putText(info_panel, status_text, (panel_x, panel_y + 10), FONT, 0.8, color, 2)
-        panel_y += line_height * 2
+                cv2.putText(info_panel, status_text, (panel_x, panel_y + 10), FONT, 0.8, color, 2)
+                panel_y += line_height * 2
 
-        details = current_details
+                details = current_details
         
-        # AGE, GENDER, LAST VISIT
-        fields = [("AGE", details.get("age", "N/A")), ("GENDER", details.get("gender", "N/A")), ("LAST VISIT", details.get("last_visit", "N/A").split(' ')[0])]
-        for label, value in fields:
-            cv2.putText(info_panel, f"{label}: {str(value).upper()}", (panel_x, panel_y), FONT, 0.6, NEON_GREEN, 1)
-            panel_y += line_height
-
-        # ALLERGIES (Critical Alert)
-        allergies = details.get("allergies", "None").upper()
-        allergy_color = CRITICAL_RED_BGR if allergies not in ["NONE", "N/A"] and name != "Unknown" else NEON_GREEN
-        alert_text = f"ALERT: {allergies}"
+                # AGE, GENDER, LAST VISIT
+                fields = [("AGE", details.get("age", "N/A")), ("GENDER", details.get("gender", "N/A")), ("LAST VISIT", details.get("last_visit", "N/A").split(' ')[0])]
+                for label, value in fields:
+                    cv2.putText(info_panel, f"{label}: {str(value).upper()}", (panel_x, panel_y), FONT, 0.6, NEON_GREEN, 1)
+                    panel_y += line_height
+
+                # ALLERGIES (Critical Alert)
+                allergies = details.get("allergies", "None").upper()
+                allergy_color = CRITICAL_RED_BGR if allergies not in ["NONE", "N/A"] and name != "Unknown" else NEON_GREEN
+                alert_text = f"ALERT: {allergies}"
         
-        panel_y += 10
-        cv2.putText(info_panel, alert_text, (panel_x, panel_y), FONT, 0.7, allergy_color, 2)
+                panel_y += 10
+                cv2.putText(info_panel, alert_text, (panel_x, panel_y), FONT, 0.7, allergy_color, 2)
         
-        # History/Triage Note
-        panel_y += line_height + 10
-        cv2.putText(info_panel, ":: HISTORY LOG ::", (panel_x, panel_y), FONT, 0.6, NEON_CYAN, 1)
-        panel_y += line_height
+                # History/Triage Note
+                panel_y += line_height + 10 # HISTORY LOG title (pre-rendered)
+                panel_y += line_height
         
-        history_text = details.get("history", "NO DATA LOGGED.")
+                history_text = details.get("history", "NO DATA LOGGED.")
         
-        # Simple text wrapping for history
-        words = history_text.split()
-        current_line = ""
-        history_line_height = 20
-        for word in words:
-            text_size, _ = cv2.getTextSize(current_line + " " + word, FONT, 0.5, 1)
-            if text_size[0] < (INFO_PANEL_WIDTH - 2*panel_x):
-                current_line += " " + word
-            else:
-                cv2.putText(info_panel, current_line.strip(), (panel_x, panel_y), FONT, 0.5, GRAY_TEXT, 1)
-                panel_y += history_line_height
-                current_line = word
-        cv2.putText(info_panel, current_line.strip(), (panel_x, panel_y), FONT, 0.5, GRAY_TEXT, 1)
+                # Simple text wrapping for history (cached, so only laid out when the text changes)
+                history_lines = wrap_text(history_text, 0.5, INFO_PANEL_WIDTH - 2*panel_x)
+                history_line_height = 20
+                for line in history_lines[:-1]:
+                    cv2.putText(info_panel, line, (panel_x, panel_y), FONT, 0.5, GRAY_TEXT, 1)
+                    panel_y += history_line_height
+                cv2.putText(info_panel, history_lines[-1], (panel_x, panel_y), FONT, 0.5, GRAY_TEXT, 1)
         
-        # --- APPOINTMENTS SECTION ---
-        panel_y += 30 # Spacer
-        cv2.putText(info_panel, ":: APPOINTMENT STATUS ::", (panel_x, panel_y), FONT, 0.6, YELLOW_TEXT, 1)
-        panel_y += line_height
+                # --- APPOINTMENTS SECTION ---
+                panel_y += 30 # Spacer
+                draw_label(info_panel, ":: APPOINTMENT STATUS ::", (panel_x, panel_y), 0.6, YELLOW_TEXT, 1)
+                panel_y += line_height
         
-        if current_appointments:
-            for appt in current_appointments:
-                # Highlight if appointment is today
-                try:
-                    appt_date = datetime.strptime(appt['date'], "%Y-%m-%d").date()
-                    is_today = appt_date == datetime.now().date()
-                except:
-                    is_today = False
+                if current_appointments:
+                    for appt in current_appointments:
+                        # Highlight if appointment is today
+                        is_today = parse_appointment_date(appt['date']) == today
                     
-                color = APPOINTMENT_COLOR if is_today else GRAY_TEXT
-                appt_prefix = "TODAY " if is_today else ""
+                        color = APPOINTMENT_COLOR if is_today else GRAY_TEXT
+                        appt_prefix = "TODAY " if is_today else ""
                 
-                doctor_name = appt.get('doctor', 'UNASSIGNED') 
-                appt_text = f"{appt_prefix}{appt['time']} | Dr. {doctor_name} | {appt['reason']}"
+                        doctor_name = appt.get('doctor', 'UNASSIGNED') 
+                        appt_text = f"{appt_prefix}{appt['time']} | Dr. {doctor_name} | {appt['reason']}"
                 
-                cv2.putText(info_panel, appt_text, (panel_x, panel_y), FONT, 0.5, color, 1)
-                panel_y += history_line_height
-        else:
-            cv2.putText(info_panel, "NO APPOINTMENT FOUND.", (panel_x, panel_y), FONT, 0.5, GRAY_TEXT, 1)
-            panel_y += history_line_height
+                        cv2.putText(info_panel, appt_text, (panel_x, panel_y), FONT, 0.5, color, 1)
+                        panel_y += history_line_height
+                else:
+                    draw_label(info_panel, "NO APPOINTMENT FOUND.", (panel_x, panel_y), 0.5, GRAY_TEXT, 1)
+                    panel_y += history_line_height
+
+                cached_panel = info_panel.copy()
+                cached_panel_key = panel_key
 
-        # FOOTER
-        cv2.putText(info_panel, datetime.now().strftime("%H:%M:%S"), (panel_x, H - 20), FONT, 0.6, GRAY_TEXT, 1)
-        cv2.putText(info_panel, "SYSTEM ONLINE", (INFO_PANEL_WIDTH - 150, H - 20), FONT, 0.6, NEON_GREEN, 1)
+            # FOOTER
+            cv2.putText(info_panel, datetime.now().strftime("%H:%M:%S"), (panel_x, H - 20), FONT, 0.6, GRAY_TEXT, 1)
         
         
-        # Combine the webcam feed and the info panel
-        combined_frame = np.concatenate((frame, info_panel), axis=1)
+            # Combine the webcam feed and the info panel
+            combined_frame[:, :W] = frame
 
-        cv2.imshow("ITS Triage Monitor (Press 'Q' to return to Main Menu)", combined_frame)
+            cv2.imshow("ITS Triage Monitor (Press 'Q' to return to Main Menu)", combined_frame)
 
-        key = cv2.waitKey(1) & 0xFF
-        
-        if key == ord("q"):
-            break
+            key = cv2.waitKey(1) & 0xFF
+            
+            if key == ord("q"):
+                running = False
+                break
         
+    stop_reader()
     cap.release()
     cv2.destroyAllWindows()
     cyber_log("Recognition monitor closed. Returning to Main Menu.", "INFO")
-    main_menu()
 
 
 # ===============================
@@ -1156,6 +1773,7 @@ if __name__ == "__main__":
     load_appointments()
     load_doctor_records() 
     KNOWN_ENCODINGS, KNOWN_NAMES = load_known_faces()
+    index_known_faces()
     
     if len(KNOWN_ENCODINGS) == 0:
         cyber_log("No known faces found. Please use the 'Register New Patient' option.", "WARNING")